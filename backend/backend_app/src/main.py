@@ -1,4 +1,6 @@
 # File: backend/backend_app/src/main.py
+import importlib
+import logging
 import os
 import sys
 from pathlib import Path
@@ -6,16 +8,19 @@ from pathlib import Path
 # Allow imports from package root (adjust path as needed)
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, Response, send_from_directory, jsonify
 from flask_cors import CORS
 from flask_compress import Compress
 from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.ai_routes import ai_bp
-from src.routes.booking_routes import booking_bp
-from src.routes.salon_dashboard import salon_dashboard_bp
-from src.routes.admin_dashboard import admin_dashboard_bp
-from src.routes.admin_ui_routes import admin_ui_bp
+from src.models.booking import Salon, Barber
+from src.services.response_cache import invalidate_on_commit
+from src.services.migrations import check_schema, migrate_command
+from src.services.database import engine_options, install_engine_hooks, pool_stats, replica_binds
+from src.services.counters import reconcile_counters_command
+from src.services.booking_stats import rebuild_booking_stats_command
+from src.services.slots import rebuild_slots_command
+from src.services.model_registry import init_model_registry
+from src.services.metrics import init_metrics, render_metrics
 
 # Create Flask app. Do NOT set static_folder here to the SPA's dist — Vercel serves static build separately.
 app = Flask(__name__, static_folder=None)
@@ -30,6 +35,7 @@ Compress(app)
 # Prefer DATABASE_URL (or DATABASE) env var (set this on Vercel Dashboard).
 # Fallback to a local sqlite file for local dev only.
 db_url = os.environ.get("DATABASE_URL") or os.environ.get("DATABASE") 
+local_db_fallback = not db_url
 if not db_url:
     db_dir = Path(os.path.dirname(__file__)) / "database"
     db_dir.mkdir(parents=True, exist_ok=True)
@@ -38,6 +44,11 @@ if not db_url:
 
 app.config["SQLALCHEMY_DATABASE_URI"] = db_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Pool sizing/pre-ping for server databases, busy timeout for SQLite (see services/database.py)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(db_url)
+# Optional comma-separated read replicas; views marked @reads_from_replica
+# query them round-robin (see services/database.py)
+app.config["SQLALCHEMY_BINDS"] = replica_binds(os.environ.get("DATABASE_READ_URLS"))
 
 # Configure debug from env (default False in production)
 app.debug = os.environ.get("FLASK_DEBUG", "0") == "1"
@@ -45,22 +56,74 @@ app.debug = os.environ.get("FLASK_DEBUG", "0") == "1"
 # Initialize DB
 db.init_app(app)
 with app.app_context():
-    db.create_all()
+    # Before the first connection is opened, so the SQLite pragmas apply to all of them
+    for engine in db.engines.values():
+        install_engine_hooks(engine)
+    # Per-route latency, response size and SQL counts for /api/metrics;
+    # STYLEME_SERVER_TIMING=1 also sends a Server-Timing header
+    init_metrics(app, db.engines.values())
+    # Schema changes are applied by `flask --app src.main migrate`; startup only
+    # reads the recorded version (one query). The local dev database is
+    # migrated automatically.
+    check_schema(default_mode="migrate" if local_db_fallback else "warn")
+
+app.cli.add_command(migrate_command)
+app.cli.add_command(reconcile_counters_command)
+app.cli.add_command(rebuild_booking_stats_command)
+app.cli.add_command(rebuild_slots_command)
+
+# The public salon catalogue is cached until a salon or barber row changes.
+# Registered here rather than with the booking routes because workers
+# running other roles (admin, salon) write those rows too.
+invalidate_on_commit('salons', Salon, Barber)
 
 # ---------- Register blueprints under /api/ prefix ----------
 # Ensure your blueprints expect to be under /api/...
-app.register_blueprint(user_bp, url_prefix="/api/user")
-app.register_blueprint(ai_bp, url_prefix="/api/ai")
-app.register_blueprint(booking_bp, url_prefix="/api/booking")
-app.register_blueprint(salon_dashboard_bp, url_prefix="/api/salon")
-app.register_blueprint(admin_dashboard_bp, url_prefix="/api/admin")
-# Admin UI blueprint already serves static admin UI; keep default path if desired
-app.register_blueprint(admin_ui_bp)
+# role -> (module, blueprint, url prefix); a role's modules are only imported
+# when it is enabled, so booking-only workers never load the AI stack.
+BLUEPRINTS = {
+    "user": [("src.routes.user", "user_bp", "/api/user")],
+    "ai": [("src.routes.ai_routes", "ai_bp", "/api/ai")],
+    "booking": [("src.routes.booking_routes", "booking_bp", "/api/booking")],
+    "salon": [("src.routes.salon_dashboard", "salon_dashboard_bp", "/api/salon")],
+    "admin": [
+        ("src.routes.admin_dashboard", "admin_dashboard_bp", "/api/admin"),
+        # Admin UI blueprint already serves static admin UI; keep default path if desired
+        ("src.routes.admin_ui_routes", "admin_ui_bp", None),
+    ],
+}
+
+# STYLEME_ROLES, e.g. "booking,admin", selects the blueprints this process serves (default: all)
+roles = [r.strip().lower() for r in os.environ.get("STYLEME_ROLES", "").split(",") if r.strip()] or list(BLUEPRINTS)
+unknown_roles = [r for r in roles if r not in BLUEPRINTS]
+if unknown_roles:
+    logging.error(f"Ignoring unknown STYLEME_ROLES entries: {unknown_roles}")
+
+for role in BLUEPRINTS:
+    if role not in roles:
+        continue
+    for module_name, blueprint_name, url_prefix in BLUEPRINTS[role]:
+        blueprint = getattr(importlib.import_module(module_name), blueprint_name)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+if "ai" in roles:
+    # Warm the face-analysis models (STYLEME_AI_PRELOAD selects which, or none)
+    init_model_registry()
 
 # ---------- Healthcheck and error handlers ----------
 @app.route("/api/health")
 def health():
-    return jsonify({"status": "ok", "env": os.environ.get("FLASK_ENV", "production")})
+    return jsonify({
+        "status": "ok",
+        "env": os.environ.get("FLASK_ENV", "production"),
+        "roles": [r for r in BLUEPRINTS if r in roles],
+        "database": pool_stats(db.engine, db.engines),
+    })
+
+@app.route("/api/metrics")
+def metrics():
+    # Prometheus text format; values are per worker process
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
 
 @app.errorhandler(404)
 def not_found(e):
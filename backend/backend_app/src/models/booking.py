@@ -38,10 +38,41 @@ class Booking(db.Model):
     status = db.Column(db.String(50), nullable=False, default="pending")
     service_type = db.Column(db.String(100), nullable=True)
     notes = db.Column(db.Text, nullable=True)
+    # Length of the appointment; NULL means one slot (STYLEME_SLOT_MINUTES)
+    duration_minutes = db.Column(db.Integer, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     user = db.relationship("User", backref=db.backref("bookings", lazy=True))
 
+    # Composite indexes backing the dashboard/listing filters; booking_time
+    # filters must be plain range comparisons (not func.date) to use them.
+    __table_args__ = (
+        db.Index("ix_booking_salon_id_booking_time", "salon_id", "booking_time"),
+        db.Index("ix_booking_salon_id_status", "salon_id", "status"),
+        db.Index("ix_booking_user_id_booking_time", "user_id", "booking_time"),
+        db.Index("ix_booking_status_booking_time", "status", "booking_time"),
+        db.Index("ix_booking_booking_time_id", "booking_time", "id"),
+    )
+
     def __repr__(self):
         return f"<Booking {self.id} - {self.status}>"
 
+
+class BarberSlot(db.Model):
+    """One slot-sized cell of a barber's time held by a booking.
+
+    The primary key makes ``(barber_id, slot_start)`` unique, so two
+    bookings that overlap for the same barber cannot both commit; rows are
+    kept in step with bookings by ``services/slots.py``.
+    """
+    barber_id = db.Column(db.Integer, db.ForeignKey("barber.id"), nullable=False)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    slot_end = db.Column(db.DateTime, nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey("booking.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    __table_args__ = (
+        db.PrimaryKeyConstraint("barber_id", "slot_start", name="pk_barber_slot"),
+    )
+
+    def __repr__(self):
+        return f"<BarberSlot {self.barber_id} {self.slot_start} - booking {self.booking_id}>"
@@ -0,0 +1,31 @@
+from src.models.user import db
+
+class DashboardCounter(db.Model):
+    """Denormalized counter read by the admin dashboard.
+
+    Totals use plain names (``users``, ``bookings``, ...); per-day buckets
+    used for rolling windows are named ``<name>:<YYYY-MM-DD>``.
+    """
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DashboardCounter {self.name}={self.value}>"
+
+class BookingDailyStats(db.Model):
+    """Number of bookings per salon, appointment day and status.
+
+    Maintained on booking writes by ``services/booking_stats.py`` so the
+    analytics endpoints never have to scan the ``booking`` table.
+    """
+    salon_id = db.Column(db.Integer, db.ForeignKey("salon.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_booking_daily_stats_day", "day"),
+    )
+
+    def __repr__(self):
+        return f"<BookingDailyStats {self.salon_id} {self.day} {self.status}={self.count}>"
@@ -1,11 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+from src.services.database import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends reads of replica-enabled views to DATABASE_READ_URLS
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # Nullable: accounts created before this column existed have no timestamp
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, index=True)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -1,85 +1,110 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from src.models.user import db, User
 from src.models.booking import Salon, Barber, Booking
-from datetime import datetime, timedelta
-from sqlalchemy import func
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+from src.services.booking_queries import with_related, serialize_bookings
+from src.services.aggregates import grouped_counts
+from src.services.pagination import InvalidCursor, keyset_page
+from src.services.counters import read_dashboard_counters, reconcile_counters
+from src.services.booking_stats import clamp_window, ensure_booking_stats, window_start, daily_totals, status_totals, top_salons
+from src.services.database import reads_from_replica
+from src.services.export import (
+    EXPORT_FORMATS, bookings_export_query, encode_chunks, export_chunks, parse_export_args, users_export_query
+)
 
 admin_dashboard_bp = Blueprint('admin_dashboard_bp', __name__)
 
+def _paginate(query, columns, descending=False):
+    """Page a listing query, in cursor mode when ``?after=`` is present.
+
+    Cursor mode (``?after=`` empty for the first page, then the returned
+    ``next_cursor``) avoids OFFSET and skips the total unless ``?total=1``.
+    Page mode keeps the ``page``/``pages`` contract; ``?total=0`` skips its
+    ``COUNT(*)``.
+    """
+    per_page = request.args.get('per_page', 20, type=int)
+    total_arg = request.args.get('total')
+    if 'after' in request.args:
+        items, next_cursor = keyset_page(query, columns, request.args['after'], per_page, descending)
+        meta = {'next_cursor': next_cursor}
+        if total_arg in ('1', 'true'):
+            meta['total'] = query.order_by(None).count()
+        return items, meta
+
+    page = request.args.get('page', 1, type=int)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    pagination = query.order_by(*order).paginate(
+        page=page, per_page=per_page, error_out=False,
+        count=total_arg not in ('0', 'false')
+    )
+    return pagination.items, {
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': page
+    }
+
 @admin_dashboard_bp.route('/admin/dashboard', methods=['GET'])
+@reads_from_replica
 def get_admin_dashboard():
     try:
-        # Get overall statistics
-        total_users = User.query.count()
-        total_salons = Salon.query.count()
-        approved_salons = Salon.query.filter_by(is_approved=True).count()
-        pending_salons = Salon.query.filter_by(is_approved=False).count()
-        total_bookings = Booking.query.count()
-        
-        # Get recent activity (last 7 days)
-        week_ago = datetime.now() - timedelta(days=7)
-        recent_users = User.query.filter(User.id >= week_ago).count()  # Assuming id is auto-increment and correlates with time
-        recent_bookings = Booking.query.filter(Booking.booking_time >= week_ago).count()
-        
-        dashboard_data = {
-            'total_users': total_users,
-            'total_salons': total_salons,
-            'approved_salons': approved_salons,
-            'pending_salons': pending_salons,
-            'total_bookings': total_bookings,
-            'recent_users_7_days': recent_users,
-            'recent_bookings_7_days': recent_bookings
-        }
+        # Maintained incrementally on writes; see services/counters.py
+        dashboard_data = read_dashboard_counters()
         
         return jsonify(dashboard_data), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@admin_dashboard_bp.route('/admin/counters/reconcile', methods=['POST'])
+def reconcile_dashboard_counters():
+    try:
+        corrected = reconcile_counters()
+        return jsonify({
+            'message': 'Counters reconciled successfully',
+            'corrected': {name: {'old': old, 'new': new} for name, (old, new) in corrected.items()}
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @admin_dashboard_bp.route('/admin/users', methods=['GET'])
+@reads_from_replica
 def get_all_users():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        users = User.query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        users, meta = _paginate(User.query, [User.id])
         
+        bookings_counts = grouped_counts(Booking.user_id, [user.id for user in users])
         user_list = [
             {
                 'id': user.id,
                 'username': user.username,
                 'email': user.email,
-                'bookings_count': len(user.bookings) if hasattr(user, 'bookings') else 0
-            } for user in users.items
+                'bookings_count': bookings_counts[user.id]
+            } for user in users
         ]
         
-        return jsonify({
-            'users': user_list,
-            'total': users.total,
-            'pages': users.pages,
-            'current_page': page
-        }), 200
+        return jsonify({'users': user_list, **meta}), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_dashboard_bp.route('/admin/salons', methods=['GET'])
+@reads_from_replica
 def get_all_salons():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status')  # 'approved', 'pending', or None for all
         
-        query = Salon.query
+        query = Salon.query.options(joinedload(Salon.owner))
         if status == 'approved':
             query = query.filter_by(is_approved=True)
         elif status == 'pending':
             query = query.filter_by(is_approved=False)
         
-        salons = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        salons, meta = _paginate(query, [Salon.id])
         
+        salon_ids = [salon.id for salon in salons]
+        barbers_counts = grouped_counts(Barber.salon_id, salon_ids)
+        bookings_counts = grouped_counts(Booking.salon_id, salon_ids)
         salon_list = [
             {
                 'id': salon.id,
@@ -89,17 +114,14 @@ def get_all_salons():
                 'email': salon.email,
                 'is_approved': salon.is_approved,
                 'owner_name': salon.owner.username,
-                'barbers_count': len(salon.barbers),
-                'bookings_count': len(salon.bookings)
-            } for salon in salons.items
+                'barbers_count': barbers_counts[salon.id],
+                'bookings_count': bookings_counts[salon.id]
+            } for salon in salons
         ]
         
-        return jsonify({
-            'salons': salon_list,
-            'total': salons.total,
-            'pages': salons.pages,
-            'current_page': page
-        }), 200
+        return jsonify({'salons': salon_list, **meta}), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -126,76 +148,48 @@ def reject_salon(salon_id):
         return jsonify({'error': str(e)}), 500
 
 @admin_dashboard_bp.route('/admin/bookings', methods=['GET'])
+@reads_from_replica
 def get_all_bookings():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status')  # Filter by status if provided
         
         query = Booking.query
         if status:
             query = query.filter_by(status=status)
         
-        bookings = query.order_by(Booking.booking_time.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        bookings, meta = _paginate(with_related(query), [Booking.booking_time, Booking.id], descending=True)
         
-        booking_list = [
-            {
-                'id': booking.id,
-                'user_name': booking.user.username,
-                'salon_name': booking.salon.name,
-                'barber_name': booking.barber.name if booking.barber else None,
-                'booking_time': booking.booking_time.isoformat(),
-                'status': booking.status
-            } for booking in bookings.items
-        ]
+        booking_list = serialize_bookings(bookings, include_user=True, include_salon=True)
         
-        return jsonify({
-            'bookings': booking_list,
-            'total': bookings.total,
-            'pages': bookings.pages,
-            'current_page': page
-        }), 200
+        return jsonify({'bookings': booking_list, **meta}), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @admin_dashboard_bp.route('/admin/analytics', methods=['GET'])
+@reads_from_replica
 def get_admin_analytics():
     try:
-        # Get booking trends for the last 30 days
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        # Daily booking counts for the last 30 days
-        daily_bookings = db.session.query(
-            func.date(Booking.booking_time).label('date'),
-            func.count(Booking.id).label('count')
-        ).filter(
-            Booking.booking_time >= thirty_days_ago
-        ).group_by(
-            func.date(Booking.booking_time)
-        ).all()
-        
-        # Top performing salons (by booking count)
-        top_salons = db.session.query(
-            Salon.name,
-            func.count(Booking.id).label('booking_count')
-        ).join(Booking).group_by(Salon.id).order_by(
-            func.count(Booking.id).desc()
-        ).limit(5).all()
+        # Served from the daily rollup; see services/booking_stats.py
+        ensure_booking_stats()
+        days = clamp_window(request.args.get('days', 30, type=int))
+        since = window_start(days)
         
         analytics_data = {
+            'days': days,
             'daily_bookings': [
                 {
-                    'date': str(booking.date),
-                    'count': booking.count
-                } for booking in daily_bookings
+                    'date': str(day),
+                    'count': count
+                } for day, count in daily_totals(since)
             ],
+            'status_breakdown': status_totals(since),
             'top_salons': [
                 {
                     'salon_name': salon.name,
                     'booking_count': salon.booking_count
-                } for salon in top_salons
+                } for salon in top_salons(limit=5)
             ]
         }
         
@@ -203,3 +197,43 @@ def get_admin_analytics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _export_response(name, build_query):
+    """Stream an export of ``build_query(start, end)`` as CSV or NDJSON.
+
+    Rows go out in batches as they are read, gzip-compressed here when the
+    client accepts it (Flask-Compress would buffer a streamed body whole).
+    """
+    try:
+        fmt, start, end = parse_export_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    gzip = 'gzip' in request.headers.get('Accept-Encoding', '').lower()
+    chunks = export_chunks(db.session, build_query(start, end), fmt)
+    headers = {
+        'Content-Disposition': f'attachment; filename="{name}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"',
+        'X-Accel-Buffering': 'no',
+    }
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(
+        stream_with_context(encode_chunks(chunks, gzip=gzip)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers=headers
+    )
+
+@admin_dashboard_bp.route('/admin/export/bookings', methods=['GET'])
+@reads_from_replica
+def export_bookings():
+    try:
+        return _export_response('bookings', bookings_export_query)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@admin_dashboard_bp.route('/admin/export/users', methods=['GET'])
+@reads_from_replica
+def export_users():
+    try:
+        return _export_response('users', users_export_query)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,20 +1,47 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, url_for
+import json
 import os
+import sys
 import base64
-import numpy as np
-import cv2
+import importlib.util
 import logging
+import threading
+from src.services.model_registry import registry
+from src.services.batching import BatchScheduler
+from src.services.result_cache import content_key, get_result_cache
+from src.services.jobs import QueueFull, get_job_queue
+from src.services.timing import StageTimer
+from src.services.metrics import record_ai_stages
+
+# OpenCV/numpy (services.image_pipeline, services.executor) and DeepFace,
+# which pulls in TensorFlow, are imported on first use rather than here so
+# that registering this blueprint stays cheap on a cold start.
 
 ai_bp = Blueprint('ai_bp', __name__)
 
-# Initialize AI models with error handling
-try:
-    from deepface import DeepFace
-    deepface_available = True
-    logging.info("DeepFace loaded successfully")
-except ImportError as e:
-    deepface_available = False
-    logging.error(f"Error importing DeepFace: {e}")
+_deepface = None
+_deepface_loaded = False
+_deepface_lock = threading.Lock()
+
+def get_deepface():
+    """Import DeepFace on first use; ``None`` if it is not available."""
+    global _deepface, _deepface_loaded
+    with _deepface_lock:
+        if not _deepface_loaded:
+            try:
+                from deepface import DeepFace
+                _deepface = DeepFace
+                logging.info("DeepFace loaded successfully")
+            except ImportError as e:
+                logging.error(f"Error importing DeepFace: {e}")
+            _deepface_loaded = True
+        return _deepface
+
+def deepface_available():
+    """Whether DeepFace can be used, without importing it just to find out."""
+    if _deepface_loaded:
+        return _deepface is not None
+    return importlib.util.find_spec('deepface') is not None
 
 # Try to import HairCLIP or alternative hair styling model
 try:
@@ -27,33 +54,230 @@ except ImportError as e:
     hair_model_available = False
     logging.error(f"Error importing HairCLIP: {e}")
 
+def decode_data_url(image_data):
+    """Raw file bytes of a ``data:image/...;base64,`` URL."""
+    return base64.b64decode(image_data.split(',')[1])
+
+def decode_image(img_bytes):
+    """Decode upright and downscaled to STYLEME_AI_MAX_SIDE for inference."""
+    from src.services.image_pipeline import decode_for_inference
+    return decode_for_inference(img_bytes)
+
+def read_image_request(*param_names):
+    """Return ``(image_bytes, params)`` from any supported upload format.
+
+    Accepts the original JSON body with a base64 ``data:`` URL, a
+    ``multipart/form-data`` upload with an ``image`` file part, or a raw
+    ``image/*`` body. For the binary formats the bytes go straight to
+    ``np.frombuffer`` with no base64 or JSON parsing; their parameters come
+    from form fields or the query string. ``image_bytes`` is ``None`` when
+    no image was sent.
+    """
+    if request.mimetype.startswith('image/'):
+        params = {name: request.args.get(name) for name in param_names}
+        return request.get_data(cache=False) or None, params
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        params = {name: request.form.get(name, request.args.get(name)) for name in param_names}
+        return (upload.read() if upload else None), params
+    data = request.get_json(silent=True) or {}
+    image = data.get('image')
+    params = {name: data.get(name) for name in param_names}
+    return (decode_data_url(image) if image else None), params
+
+OUTPUT_FORMATS = {'png': 'image/png', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+def requested_output():
+    """Return ``(format, binary)`` for a generated image.
+
+    ``binary`` is true when the Accept header prefers an image type over
+    JSON; the format comes from ``?format=`` (png, webp, jpeg), then from
+    that Accept type, and defaults to PNG for the JSON contract.
+    """
+    best = request.accept_mimetypes.best_match(['application/json', 'image/webp', 'image/jpeg', 'image/png'])
+    binary = bool(best and best.startswith('image/'))
+    fmt = (request.args.get('format') or request.form.get('format') or '').lower()
+    if fmt == 'jpg':
+        fmt = 'jpeg'
+    if fmt not in OUTPUT_FORMATS:
+        fmt = best.split('/')[1] if binary else 'png'
+    return fmt, binary
+
+def image_response(result, binary, image_field, note, extra, timer):
+    """Send a generated image as raw bytes or inside the legacy JSON body.
+
+    The per-stage timings go in ``timings_ms`` for JSON and in an
+    ``X-StyleMe-Timings`` header (Server-Timing syntax) for binary bodies.
+    """
+    record_ai_stages(timer.timings)
+    if binary:
+        return Response(
+            base64.b64decode(result['image']),
+            mimetype=result['mimetype'],
+            headers={'X-StyleMe-Note': note, 'X-StyleMe-Timings': timer.header_value()}
+        )
+    return jsonify(image_payload(result, image_field, note, extra, timer.timings)), 200
+
+def image_payload(result, image_field, note, extra, timings):
+    return {
+        image_field: f"data:{result['mimetype']};base64,{result['image']}",
+        'note': note,
+        'timings_ms': timings,
+        **extra
+    }
+
+def render_hairstyle(buffer, fmt):
+    """Executor task: decode, normalise, restyle and encode one upload.
+
+    Runs in a worker process with ``buffer`` viewing the upload in shared
+    memory. Returns ``(encoded_bytes, timings)``; the bytes are ``None``
+    if the image is invalid.
+    """
+    from src.services.image_pipeline import crop_to_face, encode_image, face_crop_enabled
+    timer = StageTimer()
+    with timer.stage('decode'):
+        img = decode_image(buffer)
+    if img is None:
+        return None, timer.timings
+    if face_crop_enabled():
+        with timer.stage('face_crop'):
+            img = crop_to_face(img)
+    with timer.stage('generate'):
+        # Use mock hairstyle generation since HairCLIP is not available
+        generated = create_mock_hairstyle_change(img)
+    with timer.stage('encode'):
+        encoded = encode_image(generated, fmt)
+    return encoded, timer.timings
+
+def decode_for_analysis(buffer):
+    """Executor task: decode one upload for face analysis."""
+    return decode_image(buffer), None
+
+def hairstyle_result(task, fmt, timer):
+    """Cacheable result dict from a finished :func:`render_hairstyle` task.
+
+    The worker's stage timings and the time spent waiting for a worker
+    are added to ``timer``. Returns ``None`` if the image was invalid.
+    """
+    timer.timings['queue'] = task.queue_ms
+    timer.timings.update(task.meta)
+    if task.output is None:
+        return None
+    return {'image': base64.b64encode(task.output).decode('utf-8'), 'mimetype': OUTPUT_FORMATS[fmt]}
+
+def run_hairstyle_pipeline(img_bytes, fmt, timer):
+    """Restyle one upload on the shared image executor and wait for it."""
+    from src.services.executor import get_image_executor
+    task = get_image_executor().run(render_hairstyle, img_bytes, fmt)
+    return hairstyle_result(task, fmt, timer)
+
+def wants_async():
+    return request.args.get('async') in ('1', 'true')
+
+def submit_hairstyle_job(img_bytes, fmt, cache_key, cached, image_field, note, extra):
+    """Queue a generation job and answer ``202`` with where to poll it.
+
+    A cache hit is recorded as an already finished job so clients always
+    follow the same flow.
+    """
+    queue = get_job_queue()
+    if cached is not None:
+        job_id = queue.completed(image_payload(cached, image_field, note, extra, {}))
+    else:
+        def on_result(task):
+            timer = StageTimer()
+            result = hairstyle_result(task, fmt, timer)
+            if result is None:
+                raise ValueError('Invalid image data')
+            store_result(cache_key, result)
+            record_ai_stages(timer.timings)
+            return image_payload(result, image_field, note, extra, timer.timings)
+        job_id = queue.submit(render_hairstyle, img_bytes, fmt, on_result=on_result)
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('ai_bp.get_job', job_id=job_id),
+        'events_url': url_for('ai_bp.job_events', job_id=job_id)
+    }), 202
+
+def queue_full_response(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = '5'
+    return response, 429
+
+def cached_result(kind, img_bytes, *params):
+    """Look up a previous result for the same image bytes and parameters.
+
+    Returns ``(key, result)``; ``result`` is ``None`` on a miss and ``key``
+    is ``None`` when the cache is disabled.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return None, None
+    key = content_key(kind, img_bytes, *params)
+    return key, cache.get(key)
+
+def store_result(key, result):
+    if key is not None:
+        get_result_cache().set(key, result)
+
 # Fallback to basic image processing if AI models are not available
 def create_mock_hairstyle_change(image):
     """Create a mock hairstyle change for demonstration purposes"""
     # This is a placeholder that just applies a simple filter
     # In a real implementation, this would use proper AI models
-    from PIL import Image, ImageEnhance
-    
-    # Convert to PIL Image
-    pil_img = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    
-    # Apply some basic enhancement to simulate a "change"
-    enhancer = ImageEnhance.Brightness(pil_img)
-    enhanced_img = enhancer.enhance(1.1)
     
-    enhancer = ImageEnhance.Contrast(enhanced_img)
-    final_img = enhancer.enhance(1.05)
-    
-    return final_img
+    from src.services.image_pipeline import adjust_brightness_contrast
+
+    # Apply some basic enhancement to simulate a "change" (same curve as
+    # PIL's Brightness(1.1) then Contrast(1.05), in one LUT pass over BGR)
+    return adjust_brightness_contrast(image, brightness=1.1, contrast=1.05)
+
+ANALYZE_ACTIONS = ['age', 'gender', 'race', 'emotion']
+
+_face_analyzer = None
+
+def analyze_images(images):
+    """Batch backend for face analysis: one result or exception per image.
+
+    Faces are detected image by image, then each attribute model runs once
+    over the stacked crops of the whole batch (see
+    :class:`~src.services.face_analysis.BatchedFaceAnalyzer`).
+    """
+    global _face_analyzer
+    if _face_analyzer is None:
+        # Only ever called from the scheduler's single worker thread
+        from src.services.face_analysis import BatchedFaceAnalyzer
+        _face_analyzer = BatchedFaceAnalyzer(ANALYZE_ACTIONS)
+    return _face_analyzer.analyze(images)
+
+_analysis_scheduler = None
+_analysis_scheduler_lock = threading.Lock()
+
+def get_analysis_scheduler():
+    """Shared micro-batching queue in front of :func:`analyze_images`.
+
+    STYLEME_AI_BATCH_SIZE (default 8) caps the images per batch and
+    STYLEME_AI_BATCH_WAIT_MS (default 5) is how long to wait for more.
+    """
+    global _analysis_scheduler
+    with _analysis_scheduler_lock:
+        if _analysis_scheduler is None:
+            _analysis_scheduler = BatchScheduler(
+                analyze_images,
+                max_batch_size=int(os.environ.get('STYLEME_AI_BATCH_SIZE', 8)),
+                max_wait_ms=float(os.environ.get('STYLEME_AI_BATCH_WAIT_MS', 5)),
+                name='face-analysis-batcher'
+            )
+        return _analysis_scheduler
 
 @ai_bp.route('/analyze_face', methods=['POST'])
 def analyze_face():
     try:
-        data = request.json
-        if 'image' not in data:
+        img_bytes, _ = read_image_request()
+        if img_bytes is None:
             return jsonify({'error': 'No image provided'}), 400
 
-        if not deepface_available:
+        if get_deepface() is None:
             # Return mock analysis if DeepFace is not available
             return jsonify({
                 'analysis': {
@@ -65,30 +289,31 @@ def analyze_face():
                 'note': 'Using mock data - DeepFace not available'
             }), 200
 
-        image_data = data['image']
-        # Decode base64 image
-        img_bytes = base64.b64decode(image_data.split(',')[1])
-        np_arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        # Same photo analysed before: answer without decoding it again
+        cache_key, cached = cached_result('analyze_face', img_bytes, ANALYZE_ACTIONS)
+        if cached is not None:
+            return jsonify(cached), 200
 
-        # Save image temporarily for DeepFace (DeepFace expects file path)
-        temp_img_path = 'temp_face_image.jpg'
-        cv2.imwrite(temp_img_path, img)
+        # Decoded on the image executor, like the hairstyle pipeline, so the
+        # request thread never holds the GIL for it
+        from src.services.executor import get_image_executor
+        img = get_image_executor().run(decode_for_analysis, img_bytes).output
+        if img is None:
+            return jsonify({'error': 'Invalid image data'}), 400
 
         try:
-            # Perform facial analysis using DeepFace
-            demography = DeepFace.analyze(img_path=temp_img_path, actions=['age', 'gender', 'race', 'emotion'], enforce_detection=False)
-            
-            # Clean up temporary file
-            if os.path.exists(temp_img_path):
-                os.remove(temp_img_path)
-
-            return jsonify({'analysis': demography}), 200
+            # Perform facial analysis using DeepFace on the decoded array;
+            # no temp file, so concurrent requests cannot see each other's images.
+            # Requests arriving together are batched onto one inference thread.
+            timer = StageTimer()
+            with timer.stage('analyze'):
+                demography = get_analysis_scheduler().submit(img)
+            record_ai_stages(timer.timings)
+
+            result = {'analysis': demography}
+            store_result(cache_key, result)
+            return jsonify(result), 200
         except Exception as deepface_error:
-            # Clean up temporary file even if DeepFace fails
-            if os.path.exists(temp_img_path):
-                os.remove(temp_img_path)
-            
             # Return mock data if DeepFace analysis fails
             return jsonify({
                 'analysis': {
@@ -106,74 +331,103 @@ def analyze_face():
 @ai_bp.route('/generate_hairstyle', methods=['POST'])
 def generate_hairstyle():
     try:
-        data = request.json
-        if 'image' not in data or 'prompt' not in data:
+        img_bytes, params = read_image_request('prompt')
+        prompt = params['prompt']
+        if img_bytes is None or prompt is None:
             return jsonify({'error': 'Image and prompt are required'}), 400
 
-        image_data = data['image']
-        prompt = data['prompt']
-
-        # Decode base64 image
-        img_bytes = base64.b64decode(image_data.split(',')[1])
-        np_arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        fmt, binary = requested_output()
+        note = 'Using mock hairstyle generation - AI model not available'
+        timer = StageTimer()
+        with timer.stage('cache_lookup'):
+            cache_key, result = cached_result('generate_hairstyle', img_bytes, prompt, fmt)
+        if wants_async():
+            return submit_hairstyle_job(img_bytes, fmt, cache_key, result, 'generated_image', note, {'prompt_used': prompt})
+        if result is None:
+            result = run_hairstyle_pipeline(img_bytes, fmt, timer)
+            if result is None:
+                return jsonify({'error': 'Invalid image data'}), 400
+            store_result(cache_key, result)
 
-        # Use mock hairstyle generation since HairCLIP is not available
-        generated_image = create_mock_hairstyle_change(img)
-
-        # Encode generated image back to base64
-        import io
-        buffered = io.BytesIO()
-        generated_image.save(buffered, format="PNG")
-        encoded_image = base64.b64encode(buffered.getvalue()).decode('utf-8')
-
-        return jsonify({
-            'generated_image': f'data:image/png;base64,{encoded_image}',
-            'note': 'Using mock hairstyle generation - AI model not available',
-            'prompt_used': prompt
-        }), 200
+        return image_response(result, binary, 'generated_image', note, {'prompt_used': prompt}, timer)
+    except QueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @ai_bp.route('/modify_hairstyle', methods=['POST'])
 def modify_hairstyle():
     try:
-        data = request.json
-        if 'image' not in data or 'modification_prompt' not in data:
+        img_bytes, params = read_image_request('modification_prompt')
+        modification_prompt = params['modification_prompt']
+        if img_bytes is None or modification_prompt is None:
             return jsonify({'error': 'Image and modification_prompt are required'}), 400
 
-        image_data = data['image']
-        modification_prompt = data['modification_prompt']
+        fmt, binary = requested_output()
+        note = 'Using mock hairstyle modification - AI model not available'
+        timer = StageTimer()
+        with timer.stage('cache_lookup'):
+            cache_key, result = cached_result('modify_hairstyle', img_bytes, modification_prompt, fmt)
+        if wants_async():
+            return submit_hairstyle_job(img_bytes, fmt, cache_key, result, 'modified_image', note, {'modification_used': modification_prompt})
+        if result is None:
+            result = run_hairstyle_pipeline(img_bytes, fmt, timer)
+            if result is None:
+                return jsonify({'error': 'Invalid image data'}), 400
+            store_result(cache_key, result)
 
-        # Decode base64 image
-        img_bytes = base64.b64decode(image_data.split(',')[1])
-        np_arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        return image_response(result, binary, 'modified_image', note, {'modification_used': modification_prompt}, timer)
+    except QueueFull as e:
+        return queue_full_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # Use mock hairstyle modification since HairCLIP is not available
-        modified_image = create_mock_hairstyle_change(img)
+@ai_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
 
-        # Encode modified image back to base64
-        import io
-        buffered = io.BytesIO()
-        modified_image.save(buffered, format="PNG")
-        encoded_image = base64.b64encode(buffered.getvalue()).decode('utf-8')
+@ai_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events stream that emits the job once it finishes."""
+    queue = get_job_queue()
+    if queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
 
-        return jsonify({
-            'modified_image': f'data:image/png;base64,{encoded_image}',
-            'note': 'Using mock hairstyle modification - AI model not available',
-            'modification_used': modification_prompt
-        }), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    def stream():
+        while True:
+            job = queue.wait(job_id, timeout=15)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Job not found"}\n\n'
+                return
+            if job['finished_at'] is not None:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+                return
+            # Keep proxies from closing an idle connection
+            yield f": {job['status']}\n\n"
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def image_executor_stats():
+    # Only report a pool that exists; don't load the image stack for a health check
+    executor = sys.modules.get('src.services.executor')
+    return executor.get_image_executor().stats() if executor else None
 
 # Add a health check endpoint for AI services
 @ai_bp.route('/health', methods=['GET'])
 def ai_health():
     return jsonify({
         'status': 'ok',
-        'deepface_available': deepface_available,
+        'deepface_available': deepface_available(),
         'hair_model_available': hair_model_available,
+        'models': registry.status(),
+        'analysis_batching': _analysis_scheduler.stats() if _analysis_scheduler else None,
+        'analysis_batched_error': _face_analyzer.batched_error if _face_analyzer else None,
+        'result_cache': get_result_cache().stats() if get_result_cache() else None,
+        'jobs': get_job_queue().stats(),
+        'executor': image_executor_stats(),
         'message': 'AI services are running with fallback implementations'
     }), 200
 
@@ -1,14 +1,23 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, User
 from src.models.booking import Salon, Barber, Booking
-from datetime import datetime
+from src.services.booking_queries import with_related, serialize_bookings
+from src.services.response_cache import cached_response
+from src.services.slots import SlotConflict, MAX_DURATION_MINUTES, commit_reservation, parse_datetime, slot_minutes
+from src.services.availability import free_slots, parse_range, invalidate_salon_days
+from src.services.bulk_bookings import MAX_BULK_ITEMS, ConcurrentUpdate, create_bookings, update_statuses
+from sqlalchemy.orm import selectinload
+from src.services.database import reads_from_replica
 
 booking_bp = Blueprint('booking_bp', __name__)
 
 @booking_bp.route('/salons', methods=['GET'])
+# The cached salon views read from the primary: a miss right after a write
+# invalidates the cache would otherwise refill it from a lagging replica
+@cached_response('salons')
 def get_salons():
     try:
-        salons = Salon.query.filter_by(is_approved=True).all()
+        salons = Salon.query.options(selectinload(Salon.barbers)).filter_by(is_approved=True).all()
         salon_list = []
         for salon in salons:
             salon_data = {
@@ -25,6 +34,7 @@ def get_salons():
         return jsonify({'error': str(e)}), 500
 
 @booking_bp.route('/salon/<int:salon_id>', methods=['GET'])
+@cached_response('salons')
 def get_salon_details(salon_id):
     try:
         salon = Salon.query.get_or_404(salon_id)
@@ -50,7 +60,12 @@ def create_booking():
                 return jsonify({'error': f'{field} is required'}), 400
 
         # Parse booking time
-        booking_time = datetime.fromisoformat(data['booking_time'])
+        booking_time = parse_datetime(data['booking_time'])
+
+        duration_minutes = data.get('duration_minutes')
+        if duration_minutes is not None and (
+                not isinstance(duration_minutes, int) or not 0 < duration_minutes <= MAX_DURATION_MINUTES):
+            return jsonify({'error': f'duration_minutes must be between 1 and {MAX_DURATION_MINUTES}'}), 400
 
         # Create new booking
         booking = Booking(
@@ -58,52 +73,71 @@ def create_booking():
             salon_id=data['salon_id'],
             barber_id=data.get('barber_id'),
             booking_time=booking_time,
+            duration_minutes=duration_minutes,
             status='pending'
         )
 
+        # The barber's slots are reserved in the same commit; if another
+        # booking took one first, nothing is written
         db.session.add(booking)
-        db.session.commit()
+        commit_reservation()
 
         return jsonify({'message': 'Booking created successfully', 'booking_id': booking.id}), 201
+    except SlotConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @booking_bp.route('/bookings/<int:user_id>', methods=['GET'])
+@reads_from_replica
 def get_user_bookings(user_id):
     try:
-        bookings = Booking.query.filter_by(user_id=user_id).all()
-        booking_list = []
-        for booking in bookings:
-            booking_data = {
-                'id': booking.id,
-                'salon_name': booking.salon.name,
-                'barber_name': booking.barber.name if booking.barber else None,
-                'booking_time': booking.booking_time.isoformat(),
-                'status': booking.status
-            }
-            booking_list.append(booking_data)
+        bookings = with_related(Booking.query.filter_by(user_id=user_id)).all()
+        booking_list = serialize_bookings(bookings, include_salon=True)
         return jsonify({'bookings': booking_list}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @booking_bp.route('/salon/<int:salon_id>/bookings', methods=['GET'])
+@reads_from_replica
 def get_salon_bookings(salon_id):
     try:
-        bookings = Booking.query.filter_by(salon_id=salon_id).all()
-        booking_list = []
-        for booking in bookings:
-            booking_data = {
-                'id': booking.id,
-                'user_name': booking.user.username,
-                'barber_name': booking.barber.name if booking.barber else None,
-                'booking_time': booking.booking_time.isoformat(),
-                'status': booking.status
-            }
-            booking_list.append(booking_data)
+        bookings = with_related(Booking.query.filter_by(salon_id=salon_id)).all()
+        booking_list = serialize_bookings(bookings, include_user=True)
         return jsonify({'bookings': booking_list}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@booking_bp.route('/salon/<int:salon_id>/availability', methods=['GET'])
+def get_salon_availability(salon_id):
+    try:
+        try:
+            start, end, duration = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        barbers = free_slots(salon_id, start, end, duration, barber_id=request.args.get('barber_id', type=int))
+        if barbers is None:
+            return jsonify({'error': 'Salon not found'}), 404
+
+        return jsonify({
+            'salon_id': salon_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'duration': duration or slot_minutes(),
+            'slot_minutes': slot_minutes(),
+            'barbers': [
+                {
+                    'barber_id': barber['barber_id'],
+                    'name': barber['name'],
+                    'slots': [slot.isoformat() for slot in barber['slots']]
+                }
+                for barber in barbers
+            ]
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @booking_bp.route('/booking/<int:booking_id>/status', methods=['PUT'])
 def update_booking_status(booking_id):
     try:
@@ -113,9 +147,62 @@ def update_booking_status(booking_id):
 
         booking = Booking.query.get_or_404(booking_id)
         booking.status = data['status']
-        db.session.commit()
+        # Re-activating a cancelled booking has to win its slots back
+        commit_reservation()
 
         return jsonify({'message': 'Booking status updated successfully'}), 200
+    except SlotConflict as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+@booking_bp.route('/bookings', methods=['POST'])
+def create_bookings_bulk():
+    try:
+        data = request.json or {}
+        items = data.get('bookings')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'bookings must be a non-empty list'}), 400
+        if len(items) > MAX_BULK_ITEMS:
+            return jsonify({'error': f'At most {MAX_BULK_ITEMS} bookings per request'}), 400
+
+        results = create_bookings(items)
+        created = sum(1 for r in results if r['status'] == 201)
+        return jsonify({'created': created, 'results': results}), 201 if created == len(results) else 207
+    except SlotConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@booking_bp.route('/bookings/status', methods=['PATCH'])
+def update_booking_statuses():
+    try:
+        data = request.json or {}
+        # Either {"updates": [{"id": 1, "status": "confirmed"}, ...]}
+        # or {"ids": [1, 2], "status": "completed"}
+        if not isinstance(data.get('updates', data.get('ids', [])), list):
+            return jsonify({'error': 'updates and ids must be lists'}), 400
+        if 'updates' in data:
+            updates = [(u.get('id'), u.get('status')) for u in data['updates'] if isinstance(u, dict)]
+            if len(updates) != len(data['updates']):
+                return jsonify({'error': 'Each update must be an object with id and status'}), 400
+        elif 'ids' in data and 'status' in data:
+            updates = [(booking_id, data['status']) for booking_id in data['ids']]
+        else:
+            return jsonify({'error': 'updates, or ids and status, are required'}), 400
+        if not updates:
+            return jsonify({'error': 'No bookings to update'}), 400
+        if len(updates) > MAX_BULK_ITEMS:
+            return jsonify({'error': f'At most {MAX_BULK_ITEMS} bookings per request'}), 400
+
+        results, touched = update_statuses(updates, salon_id=data.get('salon_id'))
+        for salon_id, day in touched:
+            invalidate_salon_days(salon_id, [day])
+        updated = sum(1 for r in results if r.get('changed'))
+        ok = all(r['status'] == 200 for r in results)
+        return jsonify({'updated': updated, 'results': results}), 200 if ok else 207
+    except ConcurrentUpdate as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,60 +1,48 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db, User
 from src.models.booking import Salon, Barber, Booking
+from src.services.booking_queries import with_related, serialize_bookings, booking_time_in_days
+from src.services.aggregates import count_if
+from src.services.booking_stats import clamp_window, ensure_booking_stats, window_start, daily_totals, status_totals
 from datetime import datetime, timedelta
+from src.services.database import reads_from_replica
 
 salon_dashboard_bp = Blueprint('salon_dashboard_bp', __name__)
 
 @salon_dashboard_bp.route('/salon/<int:salon_id>/dashboard', methods=['GET'])
+@reads_from_replica
 def get_salon_dashboard(salon_id):
     try:
         salon = Salon.query.get_or_404(salon_id)
         
-        # Get today's bookings
         today = datetime.now().date()
-        today_bookings = Booking.query.filter(
-            Booking.salon_id == salon_id,
-            db.func.date(Booking.booking_time) == today
-        ).all()
-        
-        # Get this week's bookings
         week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=6)
-        week_bookings = Booking.query.filter(
+
+        # All three counters in a single pass over this salon's bookings
+        counts = db.session.query(
+            count_if(booking_time_in_days(today)).label('today'),
+            count_if(booking_time_in_days(week_start, week_end)).label('week'),
+            count_if(Booking.status == 'pending').label('pending')
+        ).filter(Booking.salon_id == salon_id).one()
+
+        # Only the lists shown on the dashboard are loaded as rows
+        today_bookings = with_related(Booking.query).filter(
             Booking.salon_id == salon_id,
-            db.func.date(Booking.booking_time) >= week_start,
-            db.func.date(Booking.booking_time) <= week_end
+            booking_time_in_days(today)
         ).all()
-        
-        # Get pending bookings
-        pending_bookings = Booking.query.filter(
+        pending_bookings = with_related(Booking.query).filter(
             Booking.salon_id == salon_id,
             Booking.status == 'pending'
         ).all()
-        
+
         dashboard_data = {
             'salon_name': salon.name,
-            'today_bookings_count': len(today_bookings),
-            'week_bookings_count': len(week_bookings),
-            'pending_bookings_count': len(pending_bookings),
-            'today_bookings': [
-                {
-                    'id': b.id,
-                    'user_name': b.user.username,
-                    'barber_name': b.barber.name if b.barber else None,
-                    'booking_time': b.booking_time.isoformat(),
-                    'status': b.status
-                } for b in today_bookings
-            ],
-            'pending_bookings': [
-                {
-                    'id': b.id,
-                    'user_name': b.user.username,
-                    'barber_name': b.barber.name if b.barber else None,
-                    'booking_time': b.booking_time.isoformat(),
-                    'status': b.status
-                } for b in pending_bookings
-            ]
+            'today_bookings_count': counts.today,
+            'week_bookings_count': counts.week,
+            'pending_bookings_count': counts.pending,
+            'today_bookings': serialize_bookings(today_bookings, include_user=True),
+            'pending_bookings': serialize_bookings(pending_bookings, include_user=True)
         }
         
         return jsonify(dashboard_data), 200
@@ -62,6 +50,7 @@ def get_salon_dashboard(salon_id):
         return jsonify({'error': str(e)}), 500
 
 @salon_dashboard_bp.route('/salon/<int:salon_id>/barbers', methods=['GET'])
+@reads_from_replica
 def get_salon_barbers(salon_id):
     try:
         barbers = Barber.query.filter_by(salon_id=salon_id).all()
@@ -126,25 +115,30 @@ def delete_barber(salon_id, barber_id):
         return jsonify({'error': str(e)}), 500
 
 @salon_dashboard_bp.route('/salon/<int:salon_id>/analytics', methods=['GET'])
+@reads_from_replica
 def get_salon_analytics(salon_id):
     try:
-        # Get bookings for the last 30 days
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_bookings = Booking.query.filter(
-            Booking.salon_id == salon_id,
-            Booking.booking_time >= thirty_days_ago
-        ).all()
-        
-        # Calculate analytics
-        total_bookings = len(recent_bookings)
-        completed_bookings = len([b for b in recent_bookings if b.status == 'completed'])
-        cancelled_bookings = len([b for b in recent_bookings if b.status == 'cancelled'])
-        
+        # Served from the daily rollup; see services/booking_stats.py
+        ensure_booking_stats()
+        days = clamp_window(request.args.get('days', 30, type=int))
+        since = window_start(days)
+
+        by_status = status_totals(window_start(30), salon_id=salon_id)
+        total_bookings = sum(by_status.values())
+        completed_bookings = by_status.get('completed', 0)
+        cancelled_bookings = by_status.get('cancelled', 0)
+
         analytics_data = {
             'total_bookings_30_days': total_bookings,
             'completed_bookings_30_days': completed_bookings,
             'cancelled_bookings_30_days': cancelled_bookings,
-            'completion_rate': (completed_bookings / total_bookings * 100) if total_bookings > 0 else 0
+            'completion_rate': (completed_bookings / total_bookings * 100) if total_bookings > 0 else 0,
+            'days': days,
+            'status_breakdown': by_status if days == 30 else status_totals(since, salon_id=salon_id),
+            'daily_bookings': [
+                {'date': str(day), 'count': count}
+                for day, count in daily_totals(since, salon_id=salon_id)
+            ]
         }
         
         return jsonify(analytics_data), 200
@@ -0,0 +1,58 @@
+from sqlalchemy import case, func
+from src.models.user import db
+
+
+def grouped_counts(fk_column, ids):
+    """Return ``{id: row_count}`` for ``ids`` using one ``GROUP BY`` query.
+
+    ``fk_column`` is the foreign key being counted, e.g. ``Booking.salon_id``.
+    Only the ids on the current page are counted, so the cost follows the
+    page size rather than the size of the related table. Ids without any
+    related rows map to 0.
+    """
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = db.session.query(fk_column, func.count()).filter(
+        fk_column.in_(ids)
+    ).group_by(fk_column).all()
+    counts = dict.fromkeys(ids, 0)
+    counts.update(rows)
+    return counts
+
+
+def count_if(condition):
+    """Conditional ``COUNT`` expression, portable across SQLite and Postgres.
+
+    Several of these can be selected side by side so that one scan over the
+    filtered rows yields every counter a dashboard needs.
+    """
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def upsert_increment(connection, table, keys, delta, column='value'):
+    """Add ``delta`` to ``column`` of the row identified by ``keys``.
+
+    The row is created if missing. SQLite and Postgres do it atomically with
+    ``INSERT ... ON CONFLICT DO UPDATE``; other backends fall back to
+    update-then-insert.
+    """
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**keys, **{column: delta})
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys],
+            set_={column: table.c[column] + stmt.excluded[column]}
+        ))
+        return
+
+    where = [table.c[name] == value for name, value in keys.items()]
+    result = connection.execute(
+        table.update().where(*where).values(**{column: table.c[column] + delta})
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**keys, **{column: delta}))
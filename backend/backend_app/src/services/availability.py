@@ -0,0 +1,198 @@
+import os
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+
+from src.models.user import db
+from src.models.booking import Salon, Barber, Booking, BarberSlot
+from src.services.response_cache import MemoryCache
+from src.services.slots import MAX_DURATION_MINUTES, parse_datetime, slot_minutes
+
+MAX_RANGE_DAYS = 14
+
+_day_cache = MemoryCache(
+    max_entries=int(os.environ.get('STYLEME_AVAILABILITY_CACHE_ENTRIES', 1024)),
+    ttl=int(os.environ.get('STYLEME_AVAILABILITY_TTL', 60))
+)
+
+_PENDING_KEY = 'availability:touched'
+
+
+def _namespace(salon_id):
+    return f'availability:{salon_id}'
+
+
+class BarberSchedule:
+    """A barber's busy time as sorted, non-overlapping intervals.
+
+    ``starts`` and ``ends`` are parallel lists, so whether ``[start, end)``
+    is free is one bisect on ``ends`` rather than a scan of the day.
+    """
+
+    def __init__(self, barber_id, name, intervals):
+        self.barber_id = barber_id
+        self.name = name
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def is_free(self, start, end):
+        i = bisect_right(self.ends, start)
+        return i == len(self.starts) or self.starts[i] >= end
+
+
+def load_day(salon_id, day):
+    """``[BarberSchedule, ...]`` for a salon-day, or ``None`` if the salon is unknown.
+
+    Built from one range query on the ``barber_slot`` primary key and
+    cached until a booking or barber write for that salon-day commits.
+    """
+    schedules = _day_cache.get(_namespace(salon_id), day)
+    if schedules is not None:
+        return schedules
+
+    barbers = db.session.query(Barber.id, Barber.name).filter(Barber.salon_id == salon_id).order_by(Barber.id).all()
+    if not barbers and db.session.get(Salon, salon_id) is None:
+        return None
+
+    day_start = datetime.combine(day, time.min)
+    busy = {barber_id: [] for barber_id, _ in barbers}
+    if barbers:
+        rows = db.session.query(BarberSlot.barber_id, BarberSlot.slot_start, BarberSlot.slot_end).filter(
+            BarberSlot.barber_id.in_(list(busy)),
+            BarberSlot.slot_start >= day_start,
+            BarberSlot.slot_start < day_start + timedelta(days=1)
+        )
+        for barber_id, slot_start, slot_end in rows:
+            busy[barber_id].append((slot_start, slot_end))
+
+    schedules = [BarberSchedule(barber_id, name, busy[barber_id]) for barber_id, name in barbers]
+    _day_cache.set(_namespace(salon_id), day, schedules)
+    return schedules
+
+
+def _grid_ceil(moment):
+    size = timedelta(minutes=slot_minutes())
+    midnight = datetime.combine(moment.date(), time.min)
+    return midnight - ((midnight - moment) // size) * size
+
+
+def free_slots(salon_id, start, end, duration_minutes=None, barber_id=None):
+    """Bookable start times per barber between ``start`` and ``end``.
+
+    Candidates are the slot grid points from ``start`` on at which an
+    appointment of ``duration_minutes`` fits entirely before ``end``
+    without touching a held slot. Returns ``None`` for an unknown salon.
+    """
+    duration = timedelta(minutes=duration_minutes or slot_minutes())
+    step = timedelta(minutes=slot_minutes())
+
+    days = []
+    day = start.date()
+    while datetime.combine(day, time.min) < end:
+        schedules = load_day(salon_id, day)
+        if schedules is None:
+            return None
+        days.append(schedules)
+        day += timedelta(days=1)
+
+    barbers = {}
+    for schedules in days:
+        for schedule in schedules:
+            name, intervals = barbers.setdefault(schedule.barber_id, (schedule.name, []))
+            intervals.extend(zip(schedule.starts, schedule.ends))
+
+    results = []
+    for schedule_barber_id, (name, intervals) in barbers.items():
+        if barber_id is not None and schedule_barber_id != barber_id:
+            continue
+        # Days are merged into one schedule so appointments may cross midnight
+        schedule = BarberSchedule(schedule_barber_id, name, intervals)
+        slots = []
+        candidate = _grid_ceil(start)
+        while candidate + duration <= end:
+            if schedule.is_free(candidate, candidate + duration):
+                slots.append(candidate)
+            candidate += step
+        results.append({'barber_id': schedule_barber_id, 'name': name, 'slots': slots})
+    return results
+
+
+def parse_range(args):
+    """``(start, end, duration_minutes)`` from ``from``/``to``/``duration`` query args.
+
+    ``from`` defaults to now and ``to`` to the end of that day. Raises
+    ``ValueError`` with a client-facing message for invalid input.
+    """
+    start = parse_datetime(args['from']) if args.get('from') else datetime.now().replace(second=0, microsecond=0)
+    end = parse_datetime(args['to']) if args.get('to') else datetime.combine(start.date() + timedelta(days=1), time.min)
+    if end <= start:
+        raise ValueError('to must be after from')
+    if end - start > timedelta(days=MAX_RANGE_DAYS):
+        raise ValueError(f'The range may span at most {MAX_RANGE_DAYS} days')
+    duration = int(args['duration']) if args.get('duration') else None
+    if duration is not None and not 0 < duration <= MAX_DURATION_MINUTES:
+        raise ValueError(f'duration must be between 1 and {MAX_DURATION_MINUTES}')
+    return start, end, duration
+
+
+def _booking_days(salon_id, booking_time, duration_minutes):
+    if salon_id is None or booking_time is None:
+        return set()
+    end = booking_time + timedelta(minutes=duration_minutes or slot_minutes())
+    return {(salon_id, booking_time.date()), (salon_id, end.date())}
+
+
+def _previous_value(obj, attr):
+    history = get_history(obj, attr)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_touched_days(session, flush_context):
+    """Remember which salon-days this transaction's booking writes affect.
+
+    A barber write touches every cached day of its salon (``day`` is
+    ``None``). The entries are dropped once the transaction commits.
+    """
+    touched = session.info.setdefault(_PENDING_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Booking):
+            touched |= _booking_days(obj.salon_id, obj.booking_time, obj.duration_minutes)
+            touched |= _booking_days(
+                _previous_value(obj, 'salon_id'),
+                _previous_value(obj, 'booking_time'),
+                _previous_value(obj, 'duration_minutes')
+            )
+        elif isinstance(obj, Barber):
+            touched.add((obj.salon_id, None))
+            touched.add((_previous_value(obj, 'salon_id'), None))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_touched_days(session):
+    for salon_id, day in session.info.pop(_PENDING_KEY, ()):
+        if day is None:
+            _day_cache.invalidate(_namespace(salon_id))
+        else:
+            _day_cache.delete(_namespace(salon_id), day)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_touched_days(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def invalidate_salon_days(salon_id, days):
+    """Drop cached schedules after writes that bypass the ORM."""
+    for day in days:
+        _day_cache.delete(_namespace(salon_id), day)
@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """Coalesce concurrent single-item calls into batched calls.
+
+    Request threads call :meth:`submit` and block; one worker thread takes
+    the first pending item, keeps collecting until ``max_batch_size`` items
+    are queued or ``max_wait_ms`` has passed, then calls
+    ``batch_fn(items)`` once and hands each result back to its caller.
+    ``batch_fn`` must return one result per item, in order; a result that
+    is an ``Exception`` is raised in that caller only.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=5.0, name='batch-scheduler'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item, timeout=None):
+        future = Future()
+        self._queue.put((item, future))
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                results = [e] * len(items)
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'batches': self.batches,
+            'items': self.items,
+            'queued': self._queue.qsize(),
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0
+        }
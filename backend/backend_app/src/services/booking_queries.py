@@ -0,0 +1,47 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy.orm import joinedload
+from src.models.user import User
+from src.models.booking import Salon, Barber, Booking
+
+
+def with_related(query):
+    """Eager-load the user, salon and barber names a booking listing needs.
+
+    Everything comes back in the same SELECT via LEFT OUTER JOINs, so
+    serializing a page of bookings never triggers per-row lazy loads.
+    """
+    return query.options(
+        joinedload(Booking.user).load_only(User.id, User.username),
+        joinedload(Booking.salon).load_only(Salon.id, Salon.name),
+        joinedload(Booking.barber).load_only(Barber.id, Barber.name),
+    )
+
+
+def serialize_booking(booking, include_user=False, include_salon=False):
+    """Build the booking dict shared by the user, salon and admin listings."""
+    data = {'id': booking.id}
+    if include_user:
+        data['user_name'] = booking.user.username
+    if include_salon:
+        data['salon_name'] = booking.salon.name
+    data['barber_name'] = booking.barber.name if booking.barber else None
+    data['booking_time'] = booking.booking_time.isoformat()
+    data['status'] = booking.status
+    return data
+
+
+def serialize_bookings(bookings, include_user=False, include_salon=False):
+    return [serialize_booking(b, include_user, include_salon) for b in bookings]
+
+
+def booking_time_in_days(first_day, last_day=None):
+    """Half-open ``booking_time`` range covering ``first_day``..``last_day``.
+
+    Compares the raw column against midnight boundaries so the
+    ``(..., booking_time)`` indexes on ``Booking`` stay usable, unlike
+    ``func.date(Booking.booking_time) == day``.
+    """
+    last_day = last_day or first_day
+    start = datetime.combine(first_day, time.min)
+    end = datetime.combine(last_day + timedelta(days=1), time.min)
+    return (Booking.booking_time >= start) & (Booking.booking_time < end)
@@ -0,0 +1,158 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, select
+from sqlalchemy.orm.attributes import get_history
+
+from src.models.user import db
+from src.models.booking import Salon, Booking
+from src.models.stats import BookingDailyStats, DashboardCounter
+from src.services.aggregates import upsert_increment
+
+MAX_WINDOW_DAYS = 365
+
+# Counter row written once the rollup has been built from existing bookings
+BACKFILLED = 'booking_stats_backfilled'
+
+
+def _stats_key(salon_id, booking_time, status):
+    return (salon_id, booking_time.date(), status)
+
+
+def _previous_value(booking, attr):
+    history = get_history(booking, attr)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(booking, attr)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_booking_stats(session, flush_context):
+    """Keep ``BookingDailyStats`` in step with ORM booking writes.
+
+    A booking whose salon, time or status changed moves from its old
+    ``(salon, day, status)`` bucket to the new one. Set-based statements
+    that bypass the ORM must call :func:`apply_stats_deltas` themselves.
+    """
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Booking):
+            deltas[_stats_key(obj.salon_id, obj.booking_time, obj.status)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Booking):
+            deltas[_stats_key(
+                _previous_value(obj, 'salon_id'),
+                _previous_value(obj, 'booking_time'),
+                _previous_value(obj, 'status')
+            )] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, Booking):
+            old = _stats_key(
+                _previous_value(obj, 'salon_id'),
+                _previous_value(obj, 'booking_time'),
+                _previous_value(obj, 'status')
+            )
+            new = _stats_key(obj.salon_id, obj.booking_time, obj.status)
+            if old != new:
+                deltas[old] -= 1
+                deltas[new] += 1
+
+    if deltas:
+        apply_stats_deltas(session.connection(), deltas)
+
+
+def apply_stats_deltas(connection, deltas):
+    """Add ``{(salon_id, day, status): delta}`` to the rollup table."""
+    table = BookingDailyStats.__table__
+    # Sorted so concurrent transactions lock the rows in the same order
+    for (salon_id, day, status), delta in sorted(deltas.items()):
+        if delta:
+            upsert_increment(
+                connection, table,
+                {'salon_id': salon_id, 'day': day, 'status': status},
+                delta, column='count'
+            )
+
+
+def rebuild_booking_stats():
+    """Recreate the whole rollup from the ``booking`` table in one statement.
+
+    Also marks the rollup as backfilled, so :func:`ensure_booking_stats`
+    stops checking.
+    """
+    table = BookingDailyStats.__table__
+    day = func.date(Booking.booking_time)
+    source = select(
+        Booking.salon_id, day, Booking.status, func.count()
+    ).group_by(Booking.salon_id, day, Booking.status)
+
+    db.session.execute(table.delete())
+    db.session.execute(table.insert().from_select(
+        ['salon_id', 'day', 'status', 'count'], source
+    ))
+    # An upsert, so concurrent first requests that both rebuild don't conflict
+    upsert_increment(db.session.connection(), DashboardCounter.__table__, {'name': BACKFILLED}, 1)
+    db.session.commit()
+    return db.session.query(func.count()).select_from(table).scalar()
+
+
+def ensure_booking_stats():
+    """Populate the rollup on first use for databases that predate it.
+
+    Keyed on a marker row rather than on the rollup being empty: on an
+    upgraded database the first booking written after deploy already adds
+    a rollup row, which would otherwise hide the missing history.
+    """
+    if db.session.get(DashboardCounter, BACKFILLED) is None:
+        rebuild_booking_stats()
+
+
+def clamp_window(days):
+    """``days`` limited to ``1..MAX_WINDOW_DAYS``."""
+    return max(1, min(days, MAX_WINDOW_DAYS))
+
+
+def window_start(days):
+    """First day included in a ``days``-long window ending today."""
+    return (datetime.now() - timedelta(days=clamp_window(days))).date()
+
+
+def daily_totals(since, salon_id=None):
+    """``[(day, count)]`` for days on or after ``since``, oldest first."""
+    query = db.session.query(
+        BookingDailyStats.day, func.sum(BookingDailyStats.count)
+    ).filter(BookingDailyStats.day >= since)
+    if salon_id is not None:
+        query = query.filter(BookingDailyStats.salon_id == salon_id)
+    return query.group_by(BookingDailyStats.day).order_by(BookingDailyStats.day).all()
+
+
+def status_totals(since, salon_id=None):
+    """``{status: count}`` for days on or after ``since``."""
+    query = db.session.query(
+        BookingDailyStats.status, func.sum(BookingDailyStats.count)
+    ).filter(BookingDailyStats.day >= since)
+    if salon_id is not None:
+        query = query.filter(BookingDailyStats.salon_id == salon_id)
+    return dict(query.group_by(BookingDailyStats.status).all())
+
+
+def top_salons(limit=5, since=None):
+    query = db.session.query(
+        Salon.name, func.sum(BookingDailyStats.count).label('booking_count')
+    ).join(Salon, Salon.id == BookingDailyStats.salon_id)
+    if since is not None:
+        query = query.filter(BookingDailyStats.day >= since)
+    return query.group_by(Salon.id, Salon.name).order_by(
+        func.sum(BookingDailyStats.count).desc()
+    ).limit(limit).all()
+
+
+@click.command('rebuild-booking-stats')
+@with_appcontext
+def rebuild_booking_stats_command():
+    """Rebuild the daily booking rollup from the booking table."""
+    rows = rebuild_booking_stats()
+    click.echo(f"Rebuilt booking_daily_stats with {rows} row(s)")
@@ -0,0 +1,239 @@
+from collections import Counter
+
+from sqlalchemy import case, tuple_
+
+from src.models.user import db, User
+from src.models.booking import Salon, Barber, Booking, BarberSlot
+from src.services.booking_stats import apply_stats_deltas
+from src.services.slots import (
+    RELEASED_STATUSES, MAX_DURATION_MINUTES, SlotConflict, commit_reservation, parse_datetime, slot_cells,
+    sync_slots
+)
+
+MAX_BULK_ITEMS = 500
+
+# Moves the bulk endpoint accepts; re-activating a cancelled booking has to
+# win its slots back and goes through PUT /booking/<id>/status instead
+BOOKING_TRANSITIONS = {
+    'pending': ('confirmed', 'completed', 'cancelled'),
+    'confirmed': ('completed', 'cancelled'),
+    'completed': (),
+    'cancelled': (),
+}
+
+
+class ConcurrentUpdate(Exception):
+    pass
+
+
+def _error(index, status, message, **extra):
+    return {'index': index, 'status': status, 'error': message, **extra}
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def update_statuses(updates, salon_id=None):
+    """Apply ``[(booking_id, new_status), ...]`` in one transaction.
+
+    Current rows are read with one query and every valid transition is
+    written with a single ``UPDATE ... SET status = CASE id ...``. The
+    statement only matches rows still in the status that was read, so a
+    concurrent change makes it raise :class:`ConcurrentUpdate` instead of
+    overwriting. The bookings rollup and barber slots are adjusted in the
+    same transaction because set-based statements bypass the ORM listeners.
+
+    Returns ``(results, touched_days)``: one result per update, in order,
+    and the ``(salon_id, day)`` pairs whose availability changed.
+    """
+    ids = [booking_id for booking_id, _ in updates if _is_id(booking_id)]
+    current = {
+        row.id: row for row in db.session.query(
+            Booking.id, Booking.salon_id, Booking.booking_time, Booking.duration_minutes, Booking.status
+        ).filter(Booking.id.in_(ids))
+    }
+
+    results = []
+    accepted = {}
+    seen = set()
+    for index, (booking_id, status) in enumerate(updates):
+        if not _is_id(booking_id):
+            results.append(_error(index, 400, 'id must be an integer'))
+            continue
+        row = current.get(booking_id)
+        if booking_id in seen:
+            results.append(_error(index, 400, 'Booking listed more than once', id=booking_id))
+            continue
+        seen.add(booking_id)
+        if row is None or (salon_id is not None and row.salon_id != salon_id):
+            results.append(_error(index, 404, 'Booking not found', id=booking_id))
+        elif status not in BOOKING_TRANSITIONS:
+            results.append(_error(index, 400, f'Unknown status: {status}', id=booking_id))
+        elif status == row.status:
+            results.append({'index': index, 'id': booking_id, 'status': 200, 'booking_status': status, 'changed': False})
+        elif status not in BOOKING_TRANSITIONS.get(row.status, ()):
+            results.append(_error(index, 409, f'Cannot change a {row.status} booking to {status}', id=booking_id))
+        else:
+            accepted[booking_id] = status
+            results.append({'index': index, 'id': booking_id, 'status': 200, 'booking_status': status, 'changed': True})
+
+    if not accepted:
+        return results, set()
+
+    table = Booking.__table__
+    matched = db.session.execute(
+        table.update()
+        .where(tuple_(table.c.id, table.c.status).in_([(i, current[i].status) for i in accepted]))
+        .values(status=case(accepted, value=table.c.id))
+    ).rowcount
+    if matched != len(accepted):
+        db.session.rollback()
+        raise ConcurrentUpdate('Some bookings changed while updating; reload and retry')
+
+    deltas = Counter()
+    released = []
+    touched = set()
+    for booking_id, status in accepted.items():
+        row = current[booking_id]
+        day = row.booking_time.date()
+        deltas[(row.salon_id, day, row.status)] -= 1
+        deltas[(row.salon_id, day, status)] += 1
+        if status in RELEASED_STATUSES:
+            released.append(booking_id)
+            touched.update((row.salon_id, start.date()) for start, _ in slot_cells(row.booking_time, row.duration_minutes))
+    connection = db.session.connection()
+    apply_stats_deltas(connection, deltas)
+    if released:
+        sync_slots(connection, released, [])
+    db.session.commit()
+    return results, touched
+
+
+def _parse_item(item):
+    """Validated ``Booking`` kwargs for one bulk-create item, or an error message."""
+    if not isinstance(item, dict):
+        return None, 'Each booking must be an object'
+    for field in ('user_id', 'salon_id', 'booking_time'):
+        if field not in item:
+            return None, f'{field} is required'
+    for field in ('user_id', 'salon_id', 'barber_id'):
+        value = item.get(field)
+        if value is not None and not _is_id(value):
+            return None, f'{field} must be an integer'
+    try:
+        booking_time = parse_datetime(item['booking_time'])
+    except (TypeError, ValueError):
+        return None, 'booking_time must be an ISO 8601 date-time'
+    duration_minutes = item.get('duration_minutes')
+    if duration_minutes is not None and (
+            not isinstance(duration_minutes, int) or not 0 < duration_minutes <= MAX_DURATION_MINUTES):
+        return None, f'duration_minutes must be between 1 and {MAX_DURATION_MINUTES}'
+    return {
+        'user_id': item['user_id'],
+        'salon_id': item['salon_id'],
+        'barber_id': item.get('barber_id'),
+        'booking_time': booking_time,
+        'duration_minutes': duration_minutes,
+        'service_type': item.get('service_type'),
+        'notes': item.get('notes'),
+        'status': 'pending',
+    }, None
+
+
+def _check_references(parsed, results):
+    """Move items whose user, salon or barber is missing from ``parsed`` to ``results``.
+
+    One ``IN`` query per table for the whole batch: unknown ids are a 404,
+    a barber of another salon a 400.
+    """
+    def existing(column, field):
+        ids = {values[field] for values in parsed.values() if values[field] is not None}
+        return {row[0] for row in db.session.query(column).filter(column.in_(ids))} if ids else set()
+
+    users = existing(User.id, 'user_id')
+    salons = existing(Salon.id, 'salon_id')
+    barber_ids = {values['barber_id'] for values in parsed.values() if values['barber_id'] is not None}
+    barber_salons = dict(
+        db.session.query(Barber.id, Barber.salon_id).filter(Barber.id.in_(barber_ids))
+    ) if barber_ids else {}
+
+    for index, values in list(parsed.items()):
+        barber_id = values['barber_id']
+        if values['user_id'] not in users:
+            results[index] = _error(index, 404, 'User not found')
+        elif values['salon_id'] not in salons:
+            results[index] = _error(index, 404, 'Salon not found')
+        elif barber_id is not None and barber_id not in barber_salons:
+            results[index] = _error(index, 404, 'Barber not found')
+        elif barber_id is not None and barber_salons[barber_id] != values['salon_id']:
+            results[index] = _error(index, 400, 'The barber does not work at this salon')
+        else:
+            continue
+        del parsed[index]
+
+
+def _held_cells(cells_by_index):
+    keys = {key for cells in cells_by_index.values() for key in cells}
+    if not keys:
+        return set()
+    held = set()
+    keys = list(keys)
+    # Chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(keys), 400):
+        chunk = keys[start:start + 400]
+        held.update(tuple(row) for row in db.session.query(BarberSlot.barber_id, BarberSlot.slot_start).filter(
+            tuple_(BarberSlot.barber_id, BarberSlot.slot_start).in_(chunk)
+        ))
+    return held
+
+
+def create_bookings(items, attempts=2):
+    """Create many bookings in one transaction with one result per item.
+
+    Items that are invalid, refer to a missing user, salon or barber (or a
+    barber of another salon), overlap an earlier item of the batch, or hit
+    a slot that is already held are reported and skipped; the rest are
+    inserted together, so the ORM listeners keep the counters, rollup and
+    slots in step. If another request takes a slot between the check and
+    the commit, the batch is re-checked and retried.
+    """
+    parsed = {}
+    results = {}
+    for index, item in enumerate(items):
+        values, message = _parse_item(item)
+        if message:
+            results[index] = _error(index, 400, message)
+        else:
+            parsed[index] = values
+    _check_references(parsed, results)
+
+    for attempt in range(attempts):
+        cells_by_index = {
+            index: [(values['barber_id'], start) for start, _ in slot_cells(values['booking_time'], values['duration_minutes'])]
+            for index, values in parsed.items() if values['barber_id'] is not None
+        }
+        taken = _held_cells(cells_by_index)
+        conflicts = {}
+        for index in sorted(parsed):
+            cells = cells_by_index.get(index, [])
+            if any(cell in taken for cell in cells):
+                conflicts[index] = _error(index, 409, 'The barber is already booked for the requested time')
+            else:
+                taken.update(cells)
+
+        bookings = {index: Booking(**values) for index, values in parsed.items() if index not in conflicts}
+        db.session.add_all(bookings.values())
+        try:
+            commit_reservation()
+        except SlotConflict:
+            if attempt == attempts - 1:
+                raise
+            continue
+        break
+
+    results.update(conflicts)
+    for index, booking in bookings.items():
+        # The identity key holds the id without refreshing the expired row
+        results[index] = {'index': index, 'status': 201, 'booking_id': db.inspect(booking).identity[0]}
+    return [results[index] for index in range(len(items))]
@@ -0,0 +1,170 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func
+from sqlalchemy.orm.attributes import get_history
+
+from src.models.user import db, User
+from src.models.booking import Salon, Booking
+from src.models.stats import DashboardCounter
+from src.services.aggregates import upsert_increment
+from src.services.database import use_primary
+
+USERS = 'users'
+SALONS_APPROVED = 'salons_approved'
+SALONS_PENDING = 'salons_pending'
+BOOKINGS = 'bookings'
+# Written by reconcile_counters(); its absence means the table was never seeded
+INITIALIZED = 'initialized'
+
+RECENT_DAYS = 7
+
+
+def day_key(name, day):
+    return f'{name}:{day.isoformat()}'
+
+
+def _recent_days(days=RECENT_DAYS):
+    today = datetime.utcnow().date()
+    return [today - timedelta(days=i) for i in range(days)]
+
+
+def _salon_key(is_approved):
+    return SALONS_APPROVED if is_approved else SALONS_PENDING
+
+
+def _created_day(obj):
+    return (obj.created_at or datetime.utcnow()).date()
+
+
+def _collect(deltas, obj, sign):
+    if isinstance(obj, User):
+        deltas[USERS] += sign
+        deltas[day_key(USERS, _created_day(obj))] += sign
+    elif isinstance(obj, Booking):
+        deltas[BOOKINGS] += sign
+        deltas[day_key(BOOKINGS, _created_day(obj))] += sign
+    elif isinstance(obj, Salon):
+        deltas[_salon_key(obj.is_approved)] += sign
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_counters(session, flush_context):
+    """Fold the rows written by this flush into the counters.
+
+    Runs inside the flushing transaction, so the counters commit or roll
+    back together with the rows they describe. Set-based ``UPDATE``/
+    ``DELETE`` statements bypass the ORM and are left to reconciliation.
+    """
+    deltas = Counter()
+    for obj in session.new:
+        _collect(deltas, obj, 1)
+    for obj in session.deleted:
+        _collect(deltas, obj, -1)
+    for obj in session.dirty:
+        if isinstance(obj, Salon):
+            history = get_history(obj, 'is_approved')
+            if history.deleted and history.added and bool(history.deleted[0]) != bool(history.added[0]):
+                deltas[_salon_key(history.deleted[0])] -= 1
+                deltas[_salon_key(history.added[0])] += 1
+
+    connection = None
+    # In a fixed order, so two transactions touching the same counters take
+    # their row locks in the same order instead of deadlocking
+    for name, delta in sorted(deltas.items()):
+        if delta:
+            connection = connection or session.connection()
+            upsert_increment(connection, DashboardCounter.__table__, {'name': name}, delta)
+
+
+def _daily_counts(created_at, since):
+    day = func.date(created_at)
+    rows = db.session.query(day, func.count()).filter(created_at >= since).group_by(day).all()
+    return {str(d): n for d, n in rows}
+
+
+def reconcile_counters(days=RECENT_DAYS):
+    """Recompute every counter from the source tables and fix any drift.
+
+    Meant to run periodically (``flask reconcile-counters`` from cron, or
+    ``POST /api/admin/admin/counters/reconcile``). Day buckets older than
+    the rolling window are dropped. Returns ``{name: (old, new)}`` for the
+    counters that were corrected.
+    """
+    # The dashboard view runs this lazily; count what is about to be written over
+    use_primary(db.session)
+    window = _recent_days(days)
+    since = datetime.combine(window[-1], datetime.min.time())
+    expected = {
+        USERS: User.query.count(),
+        SALONS_APPROVED: Salon.query.filter_by(is_approved=True).count(),
+        SALONS_PENDING: Salon.query.filter(Salon.is_approved.isnot(True)).count(),
+        BOOKINGS: Booking.query.count(),
+        INITIALIZED: 1,
+    }
+    for name, model in ((USERS, User), (BOOKINGS, Booking)):
+        per_day = _daily_counts(model.created_at, since)
+        for day in window:
+            expected[day_key(name, day)] = per_day.get(day.isoformat(), 0)
+
+    current = {c.name: c for c in DashboardCounter.query.all()}
+    table = DashboardCounter.__table__
+    corrected = {}
+    for name, value in expected.items():
+        counter = current.pop(name, None)
+        if counter is None:
+            # Two first requests can both find the row missing; create it
+            # without conflicting, then both write the same recomputed value
+            connection = db.session.connection()
+            upsert_increment(connection, table, {'name': name}, 0)
+            connection.execute(table.update().where(table.c.name == name).values(value=value))
+            corrected[name] = (None, value)
+        elif counter.value != value:
+            corrected[name] = (counter.value, value)
+            counter.value = value
+    for name, counter in current.items():
+        # Only stale day buckets; other rows (e.g. the booking rollup's
+        # backfill marker) belong to other services
+        if ':' in name:
+            db.session.delete(counter)
+    db.session.commit()
+
+    if corrected:
+        logging.info(f"Reconciled dashboard counters: {corrected}")
+    return corrected
+
+
+def read_dashboard_counters():
+    """Return the admin dashboard totals from the counter table."""
+    window = _recent_days()
+    recent = {name: [day_key(name, day) for day in window] for name in (USERS, BOOKINGS)}
+    names = [USERS, SALONS_APPROVED, SALONS_PENDING, BOOKINGS, INITIALIZED]
+    names += recent[USERS] + recent[BOOKINGS]
+
+    values = dict(db.session.query(DashboardCounter.name, DashboardCounter.value).filter(
+        DashboardCounter.name.in_(names)
+    ).all())
+    if INITIALIZED not in values:
+        reconcile_counters()
+        return read_dashboard_counters()
+
+    return {
+        'total_users': values.get(USERS, 0),
+        'total_salons': values.get(SALONS_APPROVED, 0) + values.get(SALONS_PENDING, 0),
+        'approved_salons': values.get(SALONS_APPROVED, 0),
+        'pending_salons': values.get(SALONS_PENDING, 0),
+        'total_bookings': values.get(BOOKINGS, 0),
+        'recent_users_7_days': sum(values.get(k, 0) for k in recent[USERS]),
+        'recent_bookings_7_days': sum(values.get(k, 0) for k in recent[BOOKINGS])
+    }
+
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Recompute the admin dashboard counters from the source tables."""
+    corrected = reconcile_counters()
+    click.echo(f"Corrected {len(corrected)} counter(s)")
@@ -0,0 +1,238 @@
+import itertools
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.sql import Select
+
+REPLICA_BIND_PREFIX = 'replica_'
+
+_replica_keys = []
+_replica_turn = itertools.count()
+_PINNED_KEY = 'pinned_to_primary'
+
+
+class TimedQueuePool(QueuePool):
+    """``QueuePool`` that records how long checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool has none idle;
+    a growing average means ``STYLEME_DB_POOL_SIZE`` is too small for the
+    worker's concurrency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = (time.perf_counter() - started) * 1000.0
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_ms_total += waited
+                self.wait_ms_max = max(self.wait_ms_max, waited)
+
+    def _create_connection(self):
+        with self._stats_lock:
+            self.connects += 1
+        return super()._create_connection()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'wait_ms_avg': round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else 0,
+                'wait_ms_max': round(self.wait_ms_max, 3),
+            }
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(db_url):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``db_url``, tuned per backend.
+
+    Server databases get a pre-pinged, recycled pool sized by
+    ``STYLEME_DB_POOL_SIZE`` (default 5), ``STYLEME_DB_MAX_OVERFLOW``
+    (10), ``STYLEME_DB_POOL_RECYCLE`` seconds (1800) and
+    ``STYLEME_DB_POOL_TIMEOUT`` seconds (30); ``STYLEME_DB_POOL=null``
+    opens a connection per checkout for use behind an external pooler such
+    as PgBouncer. SQLite files get a small pool and a driver-level busy
+    timeout; their pragmas are set by :func:`install_engine_hooks`.
+    """
+    url = make_url(db_url)
+    if _is_memory_sqlite(url):
+        return {}
+    if os.environ.get('STYLEME_DB_POOL', 'queue') == 'null':
+        return {'poolclass': NullPool}
+
+    if url.get_backend_name() == 'sqlite':
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': _env_int('STYLEME_DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('STYLEME_DB_MAX_OVERFLOW', 10),
+            'connect_args': {
+                'timeout': _env_int('STYLEME_SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0,
+                'check_same_thread': False,
+            },
+        }
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': _env_int('STYLEME_DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('STYLEME_DB_MAX_OVERFLOW', 10),
+        'pool_recycle': _env_int('STYLEME_DB_POOL_RECYCLE', 1800),
+        'pool_timeout': _env_int('STYLEME_DB_POOL_TIMEOUT', 30),
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas():
+    """Pragmas run on every new SQLite connection.
+
+    WAL lets readers proceed while one writer commits and, with
+    ``synchronous=NORMAL``, costs one fsync per checkpoint instead of per
+    commit. ``STYLEME_SQLITE_WAL=0`` keeps the rollback journal, e.g. for
+    databases on network filesystems where WAL is unsupported.
+    """
+    pragmas = [
+        f"busy_timeout={_env_int('STYLEME_SQLITE_BUSY_TIMEOUT_MS', 5000)}",
+        f"mmap_size={_env_int('STYLEME_SQLITE_MMAP_MB', 64) * 1024 * 1024}",
+        'temp_store=MEMORY',
+    ]
+    if os.environ.get('STYLEME_SQLITE_WAL', '1') == '1':
+        pragmas = ['journal_mode=WAL', 'synchronous=NORMAL'] + pragmas
+    return pragmas
+
+
+def install_engine_hooks(engine):
+    """Apply connect-time settings that engine options cannot express."""
+    if engine.dialect.name != 'sqlite' or _is_memory_sqlite(engine.url):
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(f'PRAGMA {pragma}')
+        finally:
+            cursor.close()
+
+
+def pool_stats(engine, engines=None):
+    """Connection counts and checkout waits for the health endpoint.
+
+    With ``engines`` (``db.engines``), replicas are reported under
+    ``replicas`` keyed by bind name.
+    """
+    stats = _engine_pool_stats(engine)
+    if engines and _replica_keys:
+        stats['replicas'] = {key: _engine_pool_stats(engines[key]) for key in _replica_keys if key in engines}
+    return stats
+
+
+def _engine_pool_stats(engine):
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            open=pool.checkedin() + pool.checkedout(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    if isinstance(pool, TimedQueuePool):
+        stats.update(pool.stats())
+    return stats
+
+
+def replica_binds(read_urls):
+    """``SQLALCHEMY_BINDS`` entries for the comma-separated ``read_urls``.
+
+    Each replica gets the same per-backend pool settings as the primary.
+    Only :class:`RoutingSession` uses these binds; no model is mapped to
+    them.
+    """
+    urls = [url.strip() for url in (read_urls or '').split(',') if url.strip()]
+    del _replica_keys[:]
+    binds = {}
+    for index, url in enumerate(urls):
+        key = f'{REPLICA_BIND_PREFIX}{index}'
+        binds[key] = {'url': url, **engine_options(url)}
+        _replica_keys.append(key)
+    return binds
+
+
+def reads_from_replica(view):
+    """Serve a read-only view from a read replica, if any are configured.
+
+    Replicas are taken round-robin, one per request, so every query of the
+    request sees the same replica. Anything that writes still goes to the
+    primary, and :class:`RoutingSession` keeps the rest of the request
+    there so it reads its own writes. Replicas may lag the primary, so
+    only decorate views that tolerate slightly stale data.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if _replica_keys:
+            g.db_read_bind = _replica_keys[next(_replica_turn) % len(_replica_keys)]
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def use_primary(session):
+    """Send the rest of ``session``'s statements to the primary.
+
+    For read-modify-write code reachable from replica-enabled views, whose
+    reads must not come from a lagging replica.
+    """
+    session.info[_PINNED_KEY] = True
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of replica-enabled views to a replica.
+
+    A statement goes to the request's replica only if it is a plain
+    ``SELECT``: flushes, DML, ``SELECT ... FOR UPDATE``, textual SQL and
+    bare ``session.connection()`` calls use the primary. The first of those
+    pins the session to the primary until it is removed at the end of the
+    request, so reads after a write see it.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('db_read_bind') if bind is None and has_app_context() else None
+        if replica is not None and not self.info.get(_PINNED_KEY):
+            if self._is_plain_read(clause):
+                return self._db.engines[replica]
+            self.info[_PINNED_KEY] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _is_plain_read(self, clause):
+        return (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not self._flushing
+        )
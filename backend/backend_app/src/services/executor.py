@@ -0,0 +1,337 @@
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# What a finished task resolves to: the shared output (bytes, ndarray or
+# None), the task's own picklable metadata, and where the time went.
+TaskResult = namedtuple('TaskResult', ['output', 'meta', 'queue_ms', 'run_ms'])
+
+
+class _TaskFuture(Future):
+    """Future for the copied-out result that reports the pool task's state."""
+
+    task = None
+
+    def running(self):
+        return self.task is not None and self.task.running() and not self.done()
+
+
+def _init_worker():
+    # Import the image stack once per worker instead of once per task, and
+    # keep OpenCV single-threaded so N workers use N cores, not N * cores.
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def _warm():
+    return os.getpid()
+
+
+def _mp_context():
+    # Workers are started while request threads run; a plain fork can copy a
+    # lock one of them holds (imports, logging, OpenCV) and leave the worker
+    # hung. The forkserver starts them from a clean single-threaded process.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+def _to_shared(data):
+    """Copy ``bytes`` or an ndarray into a new shared-memory block.
+
+    Returns ``(block, descriptor)``; the descriptor is what crosses the
+    process boundary instead of the pixels.
+    """
+    if isinstance(data, np.ndarray):
+        shape, dtype = data.shape, data.dtype.str
+        source = np.ascontiguousarray(data)
+    else:
+        shape, dtype = None, None
+        source = np.frombuffer(data, np.uint8)
+    block = shared_memory.SharedMemory(create=True, size=max(1, source.nbytes))
+    np.ndarray(source.shape, source.dtype, buffer=block.buf)[...] = source
+    return block, (block.name, source.nbytes, shape, dtype)
+
+
+def _view(block, descriptor):
+    _, size, shape, dtype = descriptor
+    if shape is None:
+        return np.ndarray((size,), np.uint8, buffer=block.buf)
+    return np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+
+def _copy_out(descriptor):
+    """Read back and release a block written by a worker."""
+    block = shared_memory.SharedMemory(name=descriptor[0])
+    try:
+        view = _view(block, descriptor)
+        output = view.tobytes() if descriptor[2] is None else view.copy()
+        del view
+        return output
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _run_task(fn, descriptor, args, submitted_at):
+    """Worker-side trampoline: attach the input, run ``fn``, share the output."""
+    started = time.time()
+    block = shared_memory.SharedMemory(name=descriptor[0])
+    out_descriptor = None
+    try:
+        view = _view(block, descriptor)
+        view.flags.writeable = False
+        output, meta = fn(view, *args)
+        if output is not None:
+            out_block, out_descriptor = _to_shared(output)
+            out_block.close()
+        # Drop anything still viewing the input before detaching from it
+        view = output = None
+    finally:
+        block.close()
+    return out_descriptor, meta, (started - submitted_at) * 1000.0, (time.time() - started) * 1000.0
+
+
+class ImageExecutor:
+    """Process pool for CPU-bound image work, shared by all AI handlers.
+
+    Decoding, enhancement and encoding run in worker processes so they do
+    not hold the GIL of the request threads serving booking traffic. The
+    input image and the output travel through shared memory; only a
+    ``(name, size, shape, dtype)`` descriptor is pickled.
+
+    Tasks are ``fn(buffer, *args) -> (output, meta)`` where ``buffer`` is a
+    read-only view of the submitted bytes (as ``uint8``) or ndarray,
+    ``output`` is bytes, an ndarray or ``None`` and comes back through
+    shared memory, and ``meta`` is any small picklable value. ``fn`` must be
+    a module-level function. With ``max_workers=0`` tasks run inline on the
+    calling thread, for hosts where forking is not allowed. If the pool or
+    a shared-memory block cannot be created (``OSError``, e.g. no
+    ``/dev/shm`` on AWS Lambda), the executor logs it once and runs every
+    later task inline. If a worker dies (OOM kill, segfault), the broken
+    pool is replaced and the tasks it took down are retried once.
+    """
+
+    def __init__(self, max_workers=2, prefork=True):
+        self.max_workers = max_workers
+        self.prefork = prefork
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pool_error = None
+        self.pool_restarts = 0
+        self.tasks = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.queue_ms_total = 0.0
+        self.queue_ms_max = 0.0
+        self.run_ms_total = 0.0
+        self.run_ms_max = 0.0
+
+    def _get_pool(self):
+        with self._lock:
+            # A pool inherited through fork (e.g. a preloading server master)
+            # has no live manager thread in the child; start a fresh one.
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=_mp_context(), initializer=_init_worker
+                )
+                self._pid = os.getpid()
+                if self.prefork:
+                    for future in [self._pool.submit(_warm) for _ in range(self.max_workers)]:
+                        future.result()
+            return self._pool
+
+    def submit(self, fn, data, *args):
+        """Run ``fn`` on ``data`` and return a future of :class:`TaskResult`."""
+        if self.max_workers > 0:
+            try:
+                return self._submit_to_pool(fn, data, args)
+            except OSError as e:
+                self._disable_pool(e)
+        return self._run_inline(fn, data, args)
+
+    def _disable_pool(self, error):
+        with self._lock:
+            if self.max_workers <= 0:
+                return
+            logging.error(f"Image worker pool unavailable, running image tasks inline: {error}")
+            self.max_workers = 0
+            self.pool_error = str(error)
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_to_pool(self, fn, data, args):
+        block, descriptor = _to_shared(data)
+        result = _TaskFuture()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            try:
+                self._dispatch(fn, block, descriptor, args, result, retry=True)
+            except BrokenProcessPool:
+                # The pool died since the last task; replace it and go again
+                self._dispatch(fn, block, descriptor, args, result, retry=False)
+        except Exception:
+            self._release(block)
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        return result
+
+    def _dispatch(self, fn, block, descriptor, args, result, retry):
+        pool = self._get_pool()
+        try:
+            task = pool.submit(_run_task, fn, descriptor, args, time.time())
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise
+        result.task = task
+        task.add_done_callback(lambda f: self._finish(f, pool, fn, block, descriptor, args, result, retry))
+
+    def _reset_pool(self, pool):
+        """Drop ``pool`` after a worker died (OOM kill, segfault); the next task starts a new one."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self.pool_restarts += 1
+        logging.error("Image worker pool broken (a worker died); starting a new one")
+        # Not waiting: this may run on the broken pool's own management thread
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, data, *args, timeout=None):
+        return self.submit(fn, data, *args).result(timeout=timeout)
+
+    def _run_inline(self, fn, data, args):
+        result = Future()
+        started = time.perf_counter()
+        buffer = data if isinstance(data, np.ndarray) else np.frombuffer(data, np.uint8)
+        try:
+            output, meta = fn(buffer, *args)
+            run_ms = (time.perf_counter() - started) * 1000.0
+            self._record(0.0, run_ms)
+            result.set_result(TaskResult(output, meta, 0.0, round(run_ms, 2)))
+        except Exception as e:
+            self._record(None, None)
+            result.set_exception(e)
+        return result
+
+    def _finish(self, task, pool, fn, block, descriptor, args, result, retry):
+        try:
+            out_descriptor, meta, queue_ms, run_ms = task.result()
+        except BrokenProcessPool as e:
+            self._reset_pool(pool)
+            if retry:
+                # Run it once more on a fresh pool; the input is still shared
+                try:
+                    self._dispatch(fn, block, descriptor, args, result, retry=False)
+                    return
+                except Exception as retry_error:
+                    e = retry_error
+            self._fail(block, result, e)
+            return
+        except Exception as e:
+            self._fail(block, result, e)
+            return
+        self._release(block)
+        with self._lock:
+            self.in_flight -= 1
+        try:
+            output = _copy_out(out_descriptor) if out_descriptor is not None else None
+        except Exception as e:
+            self._record(None, None)
+            result.set_exception(e)
+            return
+        self._record(queue_ms, run_ms)
+        result.set_result(TaskResult(output, meta, round(queue_ms, 2), round(run_ms, 2)))
+
+    def _fail(self, block, result, error):
+        self._release(block)
+        with self._lock:
+            self.in_flight -= 1
+        self._record(None, None)
+        result.set_exception(error)
+
+    @staticmethod
+    def _release(block):
+        try:
+            block.close()
+            block.unlink()
+        except OSError as e:
+            logging.error(f"Failed to release shared image buffer: {e}")
+
+    def _record(self, queue_ms, run_ms):
+        with self._lock:
+            if queue_ms is None:
+                self.failures += 1
+                return
+            self.tasks += 1
+            self.queue_ms_total += queue_ms
+            self.queue_ms_max = max(self.queue_ms_max, queue_ms)
+            self.run_ms_total += run_ms
+            self.run_ms_max = max(self.run_ms_max, run_ms)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pool_error': self.pool_error,
+                'pool_restarts': self.pool_restarts,
+                'started': self._pool is not None and self._pid == os.getpid(),
+                'in_flight': self.in_flight,
+                'tasks': self.tasks,
+                'failures': self.failures,
+                'queue_ms_avg': round(self.queue_ms_total / self.tasks, 2) if self.tasks else 0,
+                'queue_ms_max': round(self.queue_ms_max, 2),
+                'run_ms_avg': round(self.run_ms_total / self.tasks, 2) if self.tasks else 0,
+                'run_ms_max': round(self.run_ms_max, 2)
+            }
+
+
+_image_executor = None
+_image_executor_lock = threading.Lock()
+
+
+def default_workers():
+    """Pool size when ``STYLEME_AI_WORKERS`` is unset.
+
+    ``0`` (inline) on serverless platforms such as Vercel and AWS Lambda,
+    which cannot run a process pool, and on Linux hosts without a writable
+    ``/dev/shm`` for the shared buffers; ``2`` elsewhere.
+    """
+    if os.environ.get('VERCEL') or os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        return 0
+    if sys.platform.startswith('linux') and not os.access('/dev/shm', os.W_OK):
+        return 0
+    return 2
+
+
+def get_image_executor():
+    """Process-wide image executor.
+
+    ``STYLEME_AI_WORKERS`` sets the pool size (default: see
+    :func:`default_workers`; ``0`` runs tasks inline);
+    ``STYLEME_AI_JOB_WORKERS`` is still honoured as a fallback.
+    ``STYLEME_AI_PREFORK=0`` starts workers on demand instead of all at
+    once on first use.
+    """
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is None:
+            workers = os.environ.get('STYLEME_AI_WORKERS', os.environ.get('STYLEME_AI_JOB_WORKERS')) or default_workers()
+            _image_executor = ImageExecutor(
+                max_workers=int(workers),
+                prefork=os.environ.get('STYLEME_AI_PREFORK', '1') == '1'
+            )
+        return _image_executor
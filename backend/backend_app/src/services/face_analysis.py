@@ -0,0 +1,144 @@
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from src.services.model_registry import ACTION_MODELS, _build_deepface_model
+
+# Class order of each attribute model's output, as DeepFace reports them
+LABELS = {
+    'gender': ['Woman', 'Man'],
+    'race': ['asian', 'indian', 'black', 'white', 'middle eastern', 'latino hispanic'],
+    'emotion': ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral'],
+}
+
+FACE_SIZE = 224
+EMOTION_SIZE = 48
+
+
+def _extract_faces(img, detector_backend):
+    from deepface import DeepFace
+    return DeepFace.extract_faces(
+        img_path=img, detector_backend=detector_backend, enforce_detection=False, align=True
+    )
+
+
+def _analyze_one(img, actions):
+    from deepface import DeepFace
+    return DeepFace.analyze(img_path=img, actions=actions, enforce_detection=False)
+
+
+def letterbox(face, size=FACE_SIZE):
+    """Scale ``face`` to fit ``size`` x ``size`` and pad it with black, as DeepFace does."""
+    h, w = face.shape[:2]
+    factor = min(size / h, size / w)
+    resized = cv2.resize(face, (max(1, int(w * factor)), max(1, int(h * factor))))
+    out = np.zeros((size, size, 3), dtype=np.float32)
+    top, left = (size - resized.shape[0]) // 2, (size - resized.shape[1]) // 2
+    out[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return out
+
+
+def _percentages(probs, labels):
+    scores = 100.0 * probs / max(float(probs.sum()), 1e-12)
+    values = {label: float(score) for label, score in zip(labels, scores)}
+    return values, labels[int(np.argmax(probs))]
+
+
+class BatchedFaceAnalyzer:
+    """Face attribute analysis that runs each model once per batch.
+
+    ``DeepFace.analyze`` runs every model on one face at a time. Here faces
+    are detected per image, then the crops of every image in the batch are
+    stacked and each attribute model does a single forward pass over the
+    stack, which is where the CPU time goes. Results have the same shape
+    as ``DeepFace.analyze``'s: a list of per-face dicts for each image.
+
+    If the batched path fails as a whole (e.g. a DeepFace release whose
+    model objects differ), the error is logged once and every later batch
+    goes through ``DeepFace.analyze`` image by image.
+    """
+
+    def __init__(self, actions, builder=_build_deepface_model, extract_faces=_extract_faces,
+                 analyze_one=_analyze_one, detector_backend='opencv'):
+        self.actions = [a for a in actions if a in ACTION_MODELS]
+        self.detector_backend = detector_backend
+        self.batched = True
+        self.batched_error = None
+        self._builder = builder
+        self._extract_faces = extract_faces
+        self._analyze_one = analyze_one
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, action):
+        with self._lock:
+            model = self._models.get(action)
+            if model is None:
+                built = self._builder(ACTION_MODELS[action])
+                # DeepFace wraps the Keras model in a client object
+                model = self._models[action] = getattr(built, 'model', built)
+            return model
+
+    def analyze(self, images):
+        """One result or exception per image, in order."""
+        if self.batched:
+            try:
+                return self._analyze_batch(images)
+            except Exception as e:
+                logging.error(f"Batched face analysis failed, analyzing images one by one: {e}")
+                self.batched = False
+                self.batched_error = str(e)
+        results = []
+        for img in images:
+            try:
+                results.append(self._analyze_one(img, self.actions))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _analyze_batch(self, images):
+        results = []
+        faces = []
+        for img in images:
+            try:
+                detected = self._extract_faces(img, self.detector_backend)
+            except Exception as e:
+                results.append(e)
+                continue
+            image_faces = []
+            for face in detected:
+                if face['face'].shape[0] > 0 and face['face'].shape[1] > 0:
+                    image_faces.append({'region': face['facial_area'], 'face_confidence': face.get('confidence')})
+                    # extract_faces returns RGB in [0, 1]; the models take BGR
+                    faces.append(letterbox(face['face'][:, :, ::-1].astype(np.float32)))
+            results.append(image_faces)
+        if not faces:
+            return results
+
+        batch = np.stack(faces)
+        predictions = {action: self._predict(action, batch) for action in self.actions}
+
+        row = 0
+        for image_faces in results:
+            if isinstance(image_faces, Exception):
+                continue
+            for face in image_faces:
+                for action, probs in predictions.items():
+                    face.update(self._attributes(action, probs[row]))
+                row += 1
+        return results
+
+    def _predict(self, action, batch):
+        if action == 'emotion':
+            gray = [cv2.resize(cv2.cvtColor(face, cv2.COLOR_BGR2GRAY), (EMOTION_SIZE, EMOTION_SIZE)) for face in batch]
+            batch = np.stack(gray)[..., np.newaxis]
+        return np.asarray(self._model(action).predict(batch, verbose=0))
+
+    @staticmethod
+    def _attributes(action, probs):
+        if action == 'age':
+            return {'age': float(np.sum(probs * np.arange(len(probs))))}
+        values, dominant = _percentages(probs, LABELS[action])
+        return {action: values, f'dominant_{action}': dominant}
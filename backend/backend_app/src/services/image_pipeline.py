@@ -0,0 +1,145 @@
+import io
+import logging
+import os
+
+import cv2
+import numpy as np
+
+# EXIF orientation tag value -> transform restoring the upright image
+_ORIENTATION_TRANSFORMS = {
+    2: lambda img: cv2.flip(img, 1),
+    3: lambda img: cv2.rotate(img, cv2.ROTATE_180),
+    4: lambda img: cv2.flip(img, 0),
+    5: lambda img: cv2.transpose(img),
+    6: lambda img: cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda img: cv2.flip(cv2.transpose(img), -1),
+    8: lambda img: cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE),
+}
+
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+_ENCODE_PARAMS = {
+    'png': ('.png', [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+    'webp': ('.webp', [cv2.IMWRITE_WEBP_QUALITY, 90]),
+    'jpeg': ('.jpg', [cv2.IMWRITE_JPEG_QUALITY, 90]),
+}
+
+
+def max_side():
+    """Longest side, in pixels, images are reduced to before inference."""
+    return int(os.environ.get('STYLEME_AI_MAX_SIDE', 1024))
+
+
+def face_crop_enabled():
+    return os.environ.get('STYLEME_AI_FACE_CROP', '0') == '1'
+
+
+def read_header(img_bytes):
+    """``((width, height), orientation)`` from the file header, without decoding pixels."""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(img_bytes)) as header:
+            return header.size, header.getexif().get(0x0112, 1)
+    except Exception:
+        return None, 1
+
+
+def decode_for_inference(img_bytes, limit=None):
+    """Decode upright and no larger than ``limit`` pixels on its longest side.
+
+    JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale when that still
+    leaves at least ``limit`` pixels, which skips most of the IDCT work and
+    never materialises the full-resolution array; a final area resize
+    brings the image down to the exact limit. Returns ``None`` for data
+    OpenCV cannot decode.
+    """
+    limit = limit or max_side()
+    size, orientation = read_header(img_bytes)
+    flags = cv2.IMREAD_COLOR
+    if size is not None:
+        longest = max(size)
+        for factor, reduced_flag in _REDUCED_FLAGS:
+            if longest // factor >= limit:
+                flags = reduced_flag
+                break
+    img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if img is None:
+        return None
+
+    transform = _ORIENTATION_TRANSFORMS.get(orientation)
+    if transform is not None:
+        img = transform(img)
+
+    height, width = img.shape[:2]
+    if max(height, width) > limit:
+        scale = limit / float(max(height, width))
+        img = cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    return img
+
+
+_face_detector = None
+
+
+def _get_face_detector():
+    global _face_detector
+    if _face_detector is None:
+        path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        _face_detector = cv2.CascadeClassifier(path)
+    return _face_detector
+
+
+def crop_to_face(img, margin=0.6, top_margin=1.0):
+    """Crop to the largest detected face, widened to keep the hair in frame.
+
+    ``margin`` pads each side and the chin by that fraction of the face
+    size and ``top_margin`` pads above the forehead. The image is returned
+    unchanged when no face is found.
+    """
+    try:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        faces = _get_face_detector().detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5, minSize=(48, 48))
+    except Exception as e:
+        logging.error(f"Face detection failed: {e}")
+        return img
+    if len(faces) == 0:
+        return img
+
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    height, width = img.shape[:2]
+    left = max(0, int(x - w * margin))
+    right = min(width, int(x + w * (1 + margin)))
+    top = max(0, int(y - h * top_margin))
+    bottom = min(height, int(y + h * (1 + margin)))
+    return img[top:bottom, left:right]
+
+
+def adjust_brightness_contrast(img, brightness=1.1, contrast=1.05):
+    """Brightness then contrast, matching PIL's ``ImageEnhance`` semantics.
+
+    Both steps are per-pixel curves, so they are folded into one 256-entry
+    lookup table applied with a single ``cv2.LUT`` pass. The contrast pivot
+    (mean grey level after brightening) comes from the luminance histogram
+    instead of a second full-size image.
+    """
+    levels = np.arange(256, dtype=np.float32)
+    brightened = np.clip(levels * brightness, 0, 255)
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    mean = float(np.dot(hist, np.round(brightened)) / max(hist.sum(), 1.0))
+
+    lut = np.clip(np.round((brightened - mean) * contrast + mean), 0, 255).astype(np.uint8)
+    return cv2.LUT(img, lut)
+
+
+def encode_image(img, fmt):
+    """Encode a BGR array as ``png``, ``webp`` or ``jpeg`` bytes."""
+    ext, params = _ENCODE_PARAMS[fmt]
+    ok, buffer = cv2.imencode(ext, img, params)
+    if not ok:
+        raise ValueError(f'Could not encode image as {fmt}')
+    return buffer.tobytes()
@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+import time
+import uuid
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """Bounded background job tracker on top of the shared image executor.
+
+    Jobs are tracked in this process only, which is the local stand-in for
+    a broker: poll ``get`` on the worker that accepted the job. At most
+    ``max_pending`` jobs may be queued or running at once; beyond that
+    :meth:`submit` raises :class:`QueueFull` so callers can shed load
+    instead of buffering uploads until the box runs out of memory.
+    Finished jobs are kept for ``ttl`` seconds.
+    """
+
+    def __init__(self, executor=None, max_pending=32, ttl=600):
+        self._executor = executor
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._jobs = {}
+        self._pending = 0
+        self._cond = threading.Condition()
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Resolved on first submit so the image stack loads on first use
+        if self._executor is None:
+            from src.services.executor import get_image_executor
+            self._executor = get_image_executor()
+        return self._executor
+
+    def _new_job(self, state):
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            'id': job_id,
+            'status': state,
+            'created_at': time.time(),
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            '_future': None,
+        }
+        return job_id
+
+    def submit(self, fn, data, *args, on_result=None):
+        """Run ``fn(data, *args)`` on the executor and return the job id.
+
+        ``on_result`` maps the executor's :class:`TaskResult` to the stored
+        result and runs in this process.
+        """
+        with self._cond:
+            self._expire()
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f'Job queue is full ({self.max_pending} pending)')
+            job_id = self._new_job('queued')
+            self._pending += 1
+
+        try:
+            future = self._get_executor().submit(fn, data, *args)
+        except Exception:
+            with self._cond:
+                self._pending -= 1
+                del self._jobs[job_id]
+            raise
+        with self._cond:
+            self._jobs[job_id]['_future'] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_result))
+        return job_id
+
+    def completed(self, result):
+        """Record a job whose result is already known, e.g. a cache hit."""
+        with self._cond:
+            job_id = self._new_job('done')
+            self._jobs[job_id].update(result=result, finished_at=time.time())
+        return job_id
+
+    def _finish(self, job_id, future, on_result):
+        try:
+            result = future.result()
+            if on_result is not None:
+                result = on_result(result)
+            update = {'status': 'done', 'result': result}
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {e}")
+            update = {'status': 'failed', 'error': str(e)}
+        with self._cond:
+            self._pending -= 1
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(update, finished_at=time.time(), _future=None)
+            self._cond.notify_all()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] is not None and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _snapshot(self, job):
+        snapshot = {k: v for k, v in job.items() if not k.startswith('_')}
+        future = job['_future']
+        if snapshot['status'] == 'queued' and future is not None and future.running():
+            snapshot['status'] = 'running'
+        return snapshot
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def wait(self, job_id, timeout):
+        """Block until the job finishes or ``timeout`` seconds pass."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job['finished_at'] is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._snapshot(job) if job is not None else None
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': self._pending,
+                'max_pending': self.max_pending,
+                'tracked': len(self._jobs),
+                'rejected': self.rejected
+            }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue bounded by ``STYLEME_AI_JOB_QUEUE_MAX`` (default
+    32), keeping results for ``STYLEME_AI_JOB_TTL`` seconds (default 600)."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                max_pending=int(os.environ.get('STYLEME_AI_JOB_QUEUE_MAX', 32)),
+                ttl=int(os.environ.get('STYLEME_AI_JOB_TTL', 600))
+            )
+        return _job_queue
@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus histogram keyed by label values, safe to share across threads."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {_format(total)}')
+            lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'styleme_http_request_duration_seconds',
+    'Time from the start of a request until its response body was fully sent.',
+    ('method', 'route', 'status'), LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'styleme_http_response_size_bytes',
+    'Response body size as sent, after compression.',
+    ('method', 'route'), SIZE_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'styleme_db_queries_per_request',
+    'SQL statements executed per request.',
+    ('method', 'route'), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'styleme_db_time_per_request_seconds',
+    'Time spent executing SQL per request.',
+    ('method', 'route'), LATENCY_BUCKETS
+)
+AI_STAGE_DURATION = Histogram(
+    'styleme_ai_stage_duration_seconds',
+    'Duration of AI pipeline stages, including queueing for a worker.',
+    ('stage',), LATENCY_BUCKETS
+)
+
+METRICS = [REQUEST_DURATION, RESPONSE_SIZE, REQUEST_QUERIES, REQUEST_DB_TIME, AI_STAGE_DURATION]
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format.
+
+    Values are per process: with several workers each one reports its own,
+    so scrape them individually or aggregate in Prometheus.
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """What one request has spent so far, kept on ``flask.g``."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.ai_stages = {}
+        self.body_bytes = 0
+
+
+def _current():
+    return g.get('request_metrics') if has_app_context() else None
+
+
+def record_ai_stages(timings):
+    """Record a finished pipeline's ``{stage: milliseconds}``.
+
+    Called where the timings are complete, in the web process, since the
+    stages themselves may run in an executor worker. Inside a request they
+    are also added to its ``Server-Timing`` header.
+    """
+    for stage, ms in timings.items():
+        AI_STAGE_DURATION.observe(ms / 1000.0, stage)
+    metrics = _current()
+    if metrics is not None:
+        for stage, ms in timings.items():
+            metrics.ai_stages[stage] = metrics.ai_stages.get(stage, 0.0) + ms
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds serialization time to the request's metrics."""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            metrics = _current()
+            if metrics is not None:
+                metrics.serialize_ms += (time.perf_counter() - started) * 1000.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    metrics = _current()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_ms += (time.perf_counter() - started) * 1000.0
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+
+def _counted(body, metrics):
+    for chunk in body:
+        metrics.body_bytes += len(chunk)
+        yield chunk
+
+
+def server_timing_enabled():
+    return os.environ.get('STYLEME_SERVER_TIMING', '0') == '1'
+
+
+def _server_timing(metrics):
+    total_ms = (time.perf_counter() - metrics.started) * 1000.0
+    entries = [
+        f'db;dur={metrics.db_ms:.2f};desc="{metrics.queries} queries"',
+        f'serialize;dur={metrics.serialize_ms:.2f}',
+    ]
+    entries += [f'ai-{stage};dur={ms:.2f}' for stage, ms in metrics.ai_stages.items()]
+    entries.append(f'app;dur={total_ms:.2f}')
+    return ', '.join(entries)
+
+
+def init_metrics(app, engines):
+    """Instrument every request of ``app`` and every SQL statement on ``engines``.
+
+    Register before the first request. With ``STYLEME_SERVER_TIMING=1``
+    responses carry a ``Server-Timing`` header splitting the handler's time
+    into SQL, JSON serialization and AI stages.
+    """
+    app.json = TimedJSONProvider(app)
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+    send_server_timing = server_timing_enabled()
+
+    @app.before_request
+    def _start_request_metrics():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        metrics = g.get('request_metrics')
+        if metrics is None:
+            return response
+        if send_server_timing:
+            response.headers['Server-Timing'] = _server_timing(metrics)
+            response.headers['Timing-Allow-Origin'] = '*'
+        if response.is_streamed:
+            response.response = _counted(response.response, metrics)
+
+        method = request.method
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        def record():
+            # On close, so streamed bodies and compression are included
+            labels = (method, route)
+            size = response.content_length if response.content_length is not None else metrics.body_bytes
+            REQUEST_DURATION.observe(time.perf_counter() - metrics.started, method, route, str(response.status_code))
+            RESPONSE_SIZE.observe(size, *labels)
+            REQUEST_QUERIES.observe(metrics.queries, *labels)
+            REQUEST_DB_TIME.observe(metrics.db_ms / 1000.0, *labels)
+
+        response.call_on_close(record)
+        return response
@@ -0,0 +1,180 @@
+import logging
+import os
+from contextlib import contextmanager
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import CheckConstraint, Column, Integer, MetaData, Table, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from src.models.user import db
+# Imported for their side effect of registering tables on db.metadata
+from src.models import booking, stats  # noqa: F401
+from src.services.aggregates import upsert_increment
+from src.services.schema import add_missing_columns, create_missing_indexes
+from src.services.slots import rebuild_slots
+
+# Kept out of db.metadata so the runner owns it rather than create_all()
+_metadata = MetaData()
+# One row, pinned by its primary key, so concurrent writers cannot add a second
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('version', Integer, nullable=False),
+    CheckConstraint('id = 1', name='schema_version_single_row'),
+)
+
+# pg_advisory_lock key held while migrating; any constant shared by all processes
+MIGRATION_LOCK_KEY = 0x5374796c654d65
+
+
+def _baseline(engine):
+    """Create missing tables, then add columns and indexes older tables lack.
+
+    Idempotent, so it also brings databases created before versioning up to
+    date.
+    """
+    db.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+
+
+def _reserve_existing_bookings(engine):
+    """Hold barber slots for upcoming bookings made before slots existed.
+
+    Without them, availability shows those bookings' times as free and a
+    second booking for the same barber and time is accepted.
+    """
+    with engine.begin() as conn:
+        rows, conflicts = rebuild_slots(connection=conn)
+    logging.info(f"Reserved {rows} barber slot(s) for existing bookings")
+    if conflicts:
+        logging.error(f"Overlapping bookings left without slots, resolve them by hand: {conflicts}")
+
+
+# (version, description, fn(engine)), in order. Append new steps; never
+# edit one that has shipped.
+MIGRATIONS = [
+    (1, 'baseline schema', _baseline),
+    (2, 'reserve barber slots for existing bookings', _reserve_existing_bookings),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(engine=None):
+    """Schema version recorded in the database; 0 if it was never migrated.
+
+    One single-row query and no reflection, so it is cheap enough for the
+    import path.
+    """
+    engine = engine or db.engine
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(schema_version.c.version)).scalar() or 0
+    except DBAPIError:
+        # No schema_version table yet
+        return 0
+
+
+def _record_version(engine, version):
+    with engine.begin() as conn:
+        # Creates the row if missing without racing another writer, then sets it
+        upsert_increment(conn, schema_version, {'id': 1}, 0, column='version')
+        conn.execute(schema_version.update().where(schema_version.c.id == 1).values(version=version))
+
+
+def _ensure_version_table(engine):
+    """Create ``schema_version``, replacing the keyless table older releases made."""
+    inspector = inspect(engine)
+    if inspector.has_table('schema_version') and 'id' not in {
+            c['name'] for c in inspector.get_columns('schema_version')}:
+        with engine.begin() as conn:
+            # Duplicate rows written by the old select-then-insert collapse to the highest
+            version = conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar()
+            conn.execute(text('DROP TABLE schema_version'))
+            schema_version.create(bind=conn)
+            if version is not None:
+                conn.execute(schema_version.insert().values(id=1, version=version))
+    _metadata.create_all(bind=engine)
+
+
+@contextmanager
+def _migration_lock(engine):
+    """Serialize migrations across processes.
+
+    On Postgres a session advisory lock makes concurrent cold starts wait
+    for the first one instead of running the DDL side by side. Other
+    backends are single-host development databases and run unguarded.
+    """
+    if engine.dialect.name != 'postgresql':
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            conn.commit()
+
+
+def migrate(engine=None):
+    """Apply every migration newer than the recorded version.
+
+    Holds the migration lock throughout and reads the version only once it
+    has it, so a process that waited on another finds nothing left to do.
+    Returns the ``(version, description)`` pairs that ran.
+    """
+    engine = engine or db.engine
+    with _migration_lock(engine):
+        _ensure_version_table(engine)
+        start = current_version(engine)
+        applied = []
+        for version, description, step in MIGRATIONS:
+            if version <= start:
+                continue
+            logging.info(f"Applying schema migration {version}: {description}")
+            step(engine)
+            _record_version(engine, version)
+            applied.append((version, description))
+    return applied
+
+
+def check_schema(default_mode='warn'):
+    """Startup check: compare the database's schema version with the code's.
+
+    ``STYLEME_SCHEMA_CHECK`` picks what happens when the database is behind:
+    ``warn`` logs an error asking for ``flask migrate``, ``migrate`` applies
+    the pending migrations, and ``off`` skips the query entirely. A database
+    that was never migrated (version 0: empty, or created by ``create_all``
+    before versioning) is migrated in either of the first two modes, since
+    the app cannot serve a single request from it otherwise; :func:`migrate`
+    serializes concurrent cold starts doing so. Returns the
+    version the database is at afterwards (``None`` when skipped).
+    """
+    mode = os.environ.get('STYLEME_SCHEMA_CHECK', default_mode)
+    if mode == 'off':
+        return None
+    version = current_version()
+    if version >= LATEST_VERSION:
+        return version
+    if mode == 'migrate' or version == 0:
+        migrate()
+        return current_version()
+    logging.error(
+        f"Database schema is at version {version}, code expects {LATEST_VERSION}; "
+        f"run 'flask --app src.main migrate'"
+    )
+    return version
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Bring the database schema up to date."""
+    applied = migrate()
+    for version, description in applied:
+        click.echo(f"Applied migration {version}: {description}")
+    click.echo(f"Schema is at version {current_version()}")
@@ -0,0 +1,108 @@
+import importlib.util
+import logging
+import os
+import threading
+import time
+
+# DeepFace model behind each analyze() action
+ACTION_MODELS = {
+    'age': 'Age',
+    'gender': 'Gender',
+    'race': 'Race',
+    'emotion': 'Emotion',
+}
+
+
+def _build_deepface_model(model_name):
+    from deepface import DeepFace
+    try:
+        # deepface >= 0.0.90 groups attribute models under a task
+        return DeepFace.build_model(model_name=model_name, task='facial_attribute')
+    except TypeError:
+        return DeepFace.build_model(model_name)
+
+
+class ModelRegistry:
+    """Tracks which face-analysis models are loaded and how long they took.
+
+    DeepFace keeps built models in its own module-level cache, so building
+    them once here means the first ``DeepFace.analyze`` call after a deploy
+    no longer pays for loading the weights.
+    """
+
+    def __init__(self, builder=_build_deepface_model):
+        self._builder = builder
+        self._lock = threading.Lock()
+        self._status = {
+            action: {'state': 'not_loaded', 'load_seconds': None, 'error': None}
+            for action in ACTION_MODELS
+        }
+        self._thread = None
+
+    def load(self, actions):
+        for action in actions:
+            with self._lock:
+                if self._status[action]['state'] in ('loading', 'ready'):
+                    continue
+                self._status[action]['state'] = 'loading'
+            started = time.perf_counter()
+            try:
+                self._builder(ACTION_MODELS[action])
+            except Exception as e:
+                logging.error(f"Failed to preload {action} model: {e}")
+                state, error = 'failed', str(e)
+            else:
+                state, error = 'ready', None
+            with self._lock:
+                self._status[action].update(
+                    state=state, error=error,
+                    load_seconds=round(time.perf_counter() - started, 3)
+                )
+
+    def start(self, actions, background=True):
+        """Load ``actions`` now, or on a daemon thread when ``background``."""
+        actions = [a for a in actions if a in ACTION_MODELS]
+        if not actions:
+            return
+        if not background:
+            self.load(actions)
+            return
+        self._thread = threading.Thread(
+            target=self.load, args=(actions,), name='model-preload', daemon=True
+        )
+        self._thread.start()
+
+    def status(self):
+        with self._lock:
+            return {action: dict(info) for action, info in self._status.items()}
+
+    def is_ready(self, action):
+        with self._lock:
+            return self._status[action]['state'] == 'ready'
+
+
+registry = ModelRegistry()
+
+
+def init_model_registry():
+    """Preload the models configured through the environment.
+
+    ``STYLEME_AI_PRELOAD`` lists the actions to warm (default: all of
+    ``age,gender,race,emotion``; ``none`` disables preloading, e.g. on
+    booking-only workers). ``STYLEME_AI_PRELOAD_BACKGROUND=0`` blocks
+    startup until loading finishes instead of using a background thread.
+    """
+    preload = os.environ.get('STYLEME_AI_PRELOAD', ','.join(ACTION_MODELS))
+    if preload.strip().lower() in ('', 'none', '0'):
+        return
+    # find_spec rather than import: with background loading, TensorFlow is
+    # imported on the preload thread instead of blocking startup
+    if importlib.util.find_spec('deepface') is None:
+        logging.info("DeepFace not installed - skipping model preload")
+        return
+    actions = [a.strip().lower() for a in preload.split(',') if a.strip()]
+    unknown = [a for a in actions if a not in ACTION_MODELS]
+    if unknown:
+        logging.error(f"Ignoring unknown STYLEME_AI_PRELOAD actions: {unknown}")
+    background = os.environ.get('STYLEME_AI_PRELOAD_BACKGROUND', '1') != '0'
+    registry.start(actions, background=background)
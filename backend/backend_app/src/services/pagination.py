@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Serialize the sort-key values of the last row into an opaque token."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Inverse of :func:`encode_cursor`, coercing values to the column types."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor('Invalid cursor')
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) else v
+            for col, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def keyset_page(query, columns, after=None, per_page=20, descending=False):
+    """Fetch one page ordered on ``columns`` starting after the ``after`` cursor.
+
+    Unlike ``.paginate()`` this never issues ``OFFSET`` or ``COUNT(*)``: the
+    previous page's last sort key is turned into a row-value comparison, so
+    every page is an index range scan no matter how deep it is. ``columns``
+    must end with a unique column (usually the primary key) to break ties.
+    Returns ``(items, next_cursor)``; ``next_cursor`` is ``None`` on the
+    last page.
+    """
+    key = tuple_(*columns)
+    if after:
+        values = tuple_(*decode_cursor(after, columns))
+        query = query.filter(key < values if descending else key > values)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+
+    items = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return items, next_cursor
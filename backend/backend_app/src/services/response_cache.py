@@ -0,0 +1,275 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+
+from src.models.user import db
+
+# Same threshold Flask-Compress uses; smaller bodies are sent as-is
+GZIP_MIN_SIZE = 500
+
+
+class MemoryCache:
+    """Per-process LRU cache with a TTL on every entry.
+
+    Invalidation only reaches the current process; other workers keep their
+    entries until the TTL expires. Use :class:`RedisCache` when writes must
+    be visible across workers immediately.
+
+    Each namespace has a generation that :meth:`invalidate` bumps. A
+    :meth:`set` given the generation read before the value was computed is
+    dropped if an invalidation happened in between, so a slow miss cannot
+    put pre-commit data back.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def get(self, namespace, key, generation=None):
+        with self._lock:
+            item = self._entries.get((namespace, key))
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def set(self, namespace, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(namespace, 0):
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[cache_key]
+
+
+class RedisCache:
+    """Cache stored in a Redis-compatible server, shared by all workers.
+
+    Each namespace has a version number that is part of every key, so
+    invalidating a namespace is a single ``INCR`` and the old entries simply
+    age out through their TTL. Passing the version read before a miss to
+    :meth:`set` files the entry under that version, where no reader looks
+    once an invalidation has bumped it.
+
+    Connection errors are logged and treated as misses, so an unreachable
+    server costs caching rather than failing requests.
+    """
+
+    def __init__(self, url, ttl=300, prefix='styleme:cache'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.RedisError
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def generation(self, namespace):
+        try:
+            return int(self.client.get(f'{self.prefix}:{namespace}:version') or 0)
+        except self.errors as e:
+            logging.warning(f"Redis cache unavailable: {e}")
+            return None
+
+    def _key(self, namespace, key, generation):
+        return f'{self.prefix}:{namespace}:{generation}:{key}'
+
+    def get(self, namespace, key, generation=None):
+        if generation is None:
+            generation = self.generation(namespace)
+            if generation is None:
+                return None
+        try:
+            value = self.client.hgetall(self._key(namespace, key, generation))
+        except self.errors as e:
+            logging.warning(f"Redis cache unavailable: {e}")
+            return None
+        if not value:
+            return None
+        return {
+            'body': value[b'body'],
+            'etag': value[b'etag'].decode(),
+            'gzip': value.get(b'gzip') or None
+        }
+
+    def set(self, namespace, key, value, generation=None):
+        if generation is None:
+            generation = self.generation(namespace)
+            if generation is None:
+                return
+        redis_key = self._key(namespace, key, generation)
+        mapping = {'body': value['body'], 'etag': value['etag']}
+        if value['gzip']:
+            mapping['gzip'] = value['gzip']
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(redis_key, mapping=mapping)
+            pipe.expire(redis_key, self.ttl)
+            pipe.execute()
+        except self.errors as e:
+            logging.warning(f"Redis cache unavailable: {e}")
+
+    def invalidate(self, namespace):
+        try:
+            self.client.incr(f'{self.prefix}:{namespace}:version')
+        except self.errors as e:
+            # Entries written before this commit live on until their TTL
+            logging.error(f"Could not invalidate cache namespace {namespace}: {e}")
+
+
+class NullCache:
+    def generation(self, namespace):
+        return 0
+
+    def get(self, namespace, key, generation=None):
+        return None
+
+    def set(self, namespace, key, value, generation=None):
+        pass
+
+    def invalidate(self, namespace):
+        pass
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide cache backend, built from the environment.
+
+    ``STYLEME_CACHE_BACKEND`` is ``memory`` (default), ``redis`` or ``none``;
+    ``STYLEME_CACHE_URL``, ``STYLEME_CACHE_TTL`` and
+    ``STYLEME_CACHE_MAX_ENTRIES`` tune it.
+    """
+    global _cache
+    if _cache is None:
+        backend = os.environ.get('STYLEME_CACHE_BACKEND', 'memory')
+        ttl = int(os.environ.get('STYLEME_CACHE_TTL', 300))
+        if backend == 'redis':
+            try:
+                _cache = RedisCache(os.environ.get('STYLEME_CACHE_URL', 'redis://localhost:6379/0'), ttl=ttl)
+            except ImportError as e:
+                logging.error(f"Redis cache unavailable, falling back to memory: {e}")
+        elif backend == 'none':
+            _cache = NullCache()
+        if _cache is None:
+            _cache = MemoryCache(int(os.environ.get('STYLEME_CACHE_MAX_ENTRIES', 256)), ttl=ttl)
+    return _cache
+
+
+def _request_key():
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    return f'{request.path}?{args}'
+
+
+def _build_entry(response):
+    body = response.get_data()
+    return {
+        'body': body,
+        'etag': hashlib.sha256(body).hexdigest(),
+        'gzip': gzip.compress(body, 6) if len(body) >= GZIP_MIN_SIZE else None
+    }
+
+
+def _not_modified(etag):
+    # Flask-Compress appends ":<encoding>" to ETags it compresses, so accept
+    # the validator with or without that suffix
+    candidates = [etag] + [f'{etag}:{enc}' for enc in ('gzip', 'br', 'deflate')]
+    return any(request.if_none_match.contains(c) for c in candidates)
+
+
+def _from_entry(entry):
+    if _not_modified(entry['etag']):
+        response = Response(status=304)
+        response.set_etag(entry['etag'])
+        return response
+
+    if entry['gzip'] and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        # Pre-compressed body; Flask-Compress skips responses that already
+        # carry a Content-Encoding
+        response = Response(entry['gzip'], mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.set_etag(f"{entry['etag']}:gzip")
+    else:
+        response = Response(entry['body'], mimetype='application/json')
+        response.set_etag(entry['etag'])
+    return response
+
+
+def cached_response(namespace):
+    """Cache a JSON GET view's successful responses under ``namespace``.
+
+    Entries are keyed on path and query string and carry a strong ETag, so
+    clients can revalidate with ``If-None-Match`` and receive a 304. Call
+    :func:`invalidate_on_commit` to drop the namespace when rows change; a
+    miss that overlapped such a commit is served but not stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            key = _request_key()
+            generation = cache.generation(namespace)
+            entry = cache.get(namespace, key, generation) if generation is not None else None
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = _build_entry(response)
+                if generation is not None:
+                    cache.set(namespace, key, entry, generation)
+            response = _from_entry(entry)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_on_commit(namespace, *models):
+    """Invalidate ``namespace`` whenever a commit writes any of ``models``."""
+    flag = f'response_cache:{namespace}'
+
+    @event.listens_for(db.session, 'after_flush')
+    def _mark(session, flush_context):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, models):
+                session.info[flag] = True
+                return
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidate(session):
+        if session.info.pop(flag, False):
+            get_cache().invalidate(namespace)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _discard(session):
+        session.info.pop(flag, None)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+def _json_default(value):
+    # numpy scalars/arrays in model output
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def content_key(kind, payload, *params):
+    """Cache key for ``payload`` (raw image bytes) plus request parameters."""
+    digest = hashlib.sha256()
+    digest.update(kind.encode('utf-8'))
+    for param in params:
+        digest.update(b'\0')
+        digest.update(json.dumps(param, sort_keys=True).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU cache of JSON-serializable results, bounded by size in bytes.
+
+    Entries evicted from memory are written to ``spill_dir`` when one is
+    configured and read back (and promoted) on a later hit; the directory
+    is itself capped at ``disk_max_bytes``, oldest files first.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, spill_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(self._entries[key])
+        encoded = self._read_spilled(key)
+        if encoded is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self._store(key, encoded)
+        return json.loads(encoded)
+
+    def set(self, key, value):
+        self._store(key, json.dumps(value, default=_json_default))
+
+    def _store(self, key, encoded):
+        if len(encoded) > self.max_bytes:
+            return
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = encoded
+            self._bytes += len(encoded)
+            while self._bytes > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._bytes -= len(old_value)
+                evicted.append((old_key, old_value))
+        for old_key, old_value in evicted:
+            self._spill(old_key, old_value)
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, f'{key}.json')
+
+    def _read_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _spill(self, key, encoded):
+        if not self.spill_dir:
+            return
+        try:
+            tmp_path = f'{self._path(key)}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(encoded)
+            os.replace(tmp_path, self._path(key))
+            self._trim_disk()
+        except OSError as e:
+            logging.error(f"Failed to spill AI result to disk: {e}")
+
+    def _trim_disk(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0,
+                'spill_dir': self.spill_dir
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide AI result cache configured from the environment.
+
+    ``STYLEME_AI_CACHE_MAX_MB`` (default 64, ``0`` disables caching),
+    ``STYLEME_AI_CACHE_DIR`` to spill evicted entries to disk and
+    ``STYLEME_AI_CACHE_DISK_MAX_MB`` (default 512) to cap that directory.
+    Returns ``None`` when disabled.
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            max_mb = float(os.environ.get('STYLEME_AI_CACHE_MAX_MB', 64))
+            if max_mb <= 0:
+                return None
+            _result_cache = ResultCache(
+                max_bytes=int(max_mb * 1024 * 1024),
+                spill_dir=os.environ.get('STYLEME_AI_CACHE_DIR') or None,
+                disk_max_bytes=int(float(os.environ.get('STYLEME_AI_CACHE_DISK_MAX_MB', 512)) * 1024 * 1024)
+            )
+        return _result_cache
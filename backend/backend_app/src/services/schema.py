@@ -0,0 +1,55 @@
+import logging
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+from src.models.user import db
+
+
+def add_missing_columns(engine=None):
+    """Add nullable model columns that an existing table does not have yet.
+
+    Like indexes, new columns never reach existing tables through
+    ``db.create_all()``. Only nullable columns can be added this way;
+    anything else is logged and needs a manual migration. Returns the
+    ``table.column`` names that were added.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                logging.error(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+                continue
+            # "user" is a reserved word on Postgres, so let the dialect quote it
+            table_name = engine.dialect.identifier_preparer.format_table(table)
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN {ddl}')
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_missing_indexes(engine=None):
+    """Create any model-declared index that an existing database lacks.
+
+    ``db.create_all()`` skips tables that already exist, so indexes added to
+    a model after its table was created never reach older databases. Safe to
+    run repeatedly; returns the names of the indexes it created.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
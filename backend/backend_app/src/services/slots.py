@@ -0,0 +1,206 @@
+import os
+from datetime import datetime, time, timedelta, timezone
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import get_history
+
+from src.models.user import db
+from src.models.booking import Barber, Booking, BarberSlot
+
+# Bookings in these states no longer hold the barber's time
+RELEASED_STATUSES = ('cancelled', 'completed')
+
+MAX_DURATION_MINUTES = 8 * 60
+
+_SLOT_FIELDS = ('barber_id', 'booking_time', 'duration_minutes', 'status')
+
+
+class SlotConflict(Exception):
+    pass
+
+
+def slot_minutes():
+    """Size of a reservation cell, in minutes (``STYLEME_SLOT_MINUTES``, default 30)."""
+    return int(os.environ.get('STYLEME_SLOT_MINUTES', 30))
+
+
+def parse_datetime(value):
+    """``datetime.fromisoformat``, with offset-aware input converted to naive UTC.
+
+    Booking times are stored and compared naive; an aware one would fail
+    every comparison and subtraction against them.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def slot_cells(start, duration_minutes=None):
+    """``[(slot_start, slot_end), ...]`` covering ``duration_minutes`` from ``start``.
+
+    Cells are aligned to midnight, so an appointment that starts or ends
+    off the grid holds every cell it touches.
+    """
+    size = timedelta(minutes=slot_minutes())
+    end = start + timedelta(minutes=duration_minutes or slot_minutes())
+    midnight = datetime.combine(start.date(), time.min)
+    cell = midnight + size * ((start - midnight) // size)
+    cells = []
+    while cell < end:
+        cells.append((cell, cell + size))
+        cell += size
+    return cells
+
+
+def slot_horizon():
+    """Slots ending before this are in the past and are not held.
+
+    Midnight UTC of the previous day, so a server clock in another time
+    zone than the clients never drops a slot that is still upcoming.
+    """
+    return datetime.combine(datetime.utcnow().date() - timedelta(days=1), time.min)
+
+
+def booking_slot_rows(booking):
+    """Slot rows ``booking`` should hold: none without a barber, once released, or in the past."""
+    if booking.barber_id is None or booking.status in RELEASED_STATUSES:
+        return []
+    horizon = slot_horizon()
+    return [
+        {'barber_id': booking.barber_id, 'slot_start': start, 'slot_end': end, 'booking_id': booking.id}
+        for start, end in slot_cells(booking.booking_time, booking.duration_minutes)
+        if end > horizon
+    ]
+
+
+def _slots_changed(booking):
+    return any(get_history(booking, attr).has_changes() for attr in _SLOT_FIELDS)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _release_deleted_barbers(session, flush_context, instances):
+    """Drop the slots of barbers being deleted before the barber row goes.
+
+    ``barber_slot.barber_id`` references the barber, and the flush deletes
+    the barber before :func:`_sync_barber_slots` could release them, so
+    with foreign keys enforced the delete would fail.
+    """
+    barber_ids = [obj.id for obj in session.deleted if isinstance(obj, Barber)]
+    if barber_ids:
+        table = BarberSlot.__table__
+        session.connection().execute(table.delete().where(table.c.barber_id.in_(barber_ids)))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_barber_slots(session, flush_context):
+    """Reserve and release ``BarberSlot`` rows for the bookings in this flush.
+
+    The rows are inserted in the booking's own transaction, so the primary
+    key on ``(barber_id, slot_start)`` makes the whole commit fail with an
+    ``IntegrityError`` when another booking got there first; no lock is
+    taken up front. Set-based statements that bypass the ORM must call
+    :func:`sync_slots` themselves.
+    """
+    released = []
+    reserved = []
+    for obj in session.new:
+        if isinstance(obj, Booking):
+            reserved.extend(booking_slot_rows(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Booking) and _slots_changed(obj):
+            released.append(obj.id)
+            reserved.extend(booking_slot_rows(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Booking):
+            released.append(obj.id)
+
+    if released or reserved:
+        sync_slots(session.connection(), released, reserved)
+
+
+def sync_slots(connection, released_booking_ids, reserved_rows):
+    """Drop the slots of ``released_booking_ids``, then insert ``reserved_rows``."""
+    table = BarberSlot.__table__
+    if released_booking_ids:
+        connection.execute(table.delete().where(table.c.booking_id.in_(released_booking_ids)))
+    if reserved_rows:
+        connection.execute(table.insert(), reserved_rows)
+
+
+def is_slot_conflict(error):
+    """Whether an ``IntegrityError`` came from the barber slot key.
+
+    Postgres names the constraint; SQLite names the columns instead.
+    """
+    message = str(getattr(error, 'orig', error))
+    return 'pk_barber_slot' in message or 'barber_slot.slot_start' in message
+
+
+def commit_reservation():
+    """Commit the session, raising :class:`SlotConflict` if a slot is taken."""
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_slot_conflict(e):
+            raise SlotConflict('The barber is already booked for the requested time')
+        raise
+
+
+def rebuild_slots(since=None, connection=None):
+    """Re-derive slot rows for bookings from ``since`` (default: today) on.
+
+    Bookings made before reservations existed may already overlap; the
+    later-created one of each overlapping pair is skipped and returned.
+    Slots that ended before :func:`slot_horizon` are deleted. Runs on
+    ``connection`` when given (the caller commits), otherwise on the
+    session, which is committed.
+    """
+    since = since or datetime.combine(datetime.utcnow().date(), time.min)
+    conn = connection if connection is not None else db.session.connection()
+    bookings = Booking.__table__
+    # Include bookings that started earlier but run past ``since``
+    rows = conn.execute(
+        select(bookings.c.id, bookings.c.barber_id, bookings.c.booking_time,
+               bookings.c.duration_minutes, bookings.c.status)
+        .where(
+            bookings.c.booking_time >= since - timedelta(minutes=MAX_DURATION_MINUTES),
+            bookings.c.barber_id.isnot(None),
+            bookings.c.status.notin_(RELEASED_STATUSES)
+        )
+        .order_by(bookings.c.created_at, bookings.c.id)
+    ).all()
+
+    table = BarberSlot.__table__
+    conn.execute(table.delete().where(table.c.slot_start >= since))
+    conn.execute(table.delete().where(table.c.slot_end <= slot_horizon()))
+    taken = set()
+    slot_rows = []
+    conflicts = []
+    for booking in rows:
+        booking_rows = [row for row in booking_slot_rows(booking) if row['slot_start'] >= since]
+        keys = {(row['barber_id'], row['slot_start']) for row in booking_rows}
+        if keys & taken:
+            conflicts.append(booking.id)
+            continue
+        taken |= keys
+        slot_rows.extend(booking_rows)
+    if slot_rows:
+        conn.execute(table.insert(), slot_rows)
+    if connection is None:
+        db.session.commit()
+    return len(slot_rows), conflicts
+
+
+@click.command('rebuild-slots')
+@with_appcontext
+def rebuild_slots_command():
+    """Rebuild barber slot reservations for upcoming bookings."""
+    rows, conflicts = rebuild_slots()
+    click.echo(f"Reserved {rows} slot(s)")
+    if conflicts:
+        click.echo(f"Overlapping bookings left without slots: {conflicts}")
@@ -0,0 +1,21 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Collects wall-clock milliseconds per named pipeline stage."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000.0
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+    def header_value(self):
+        return ', '.join(f'{name};dur={ms}' for name, ms in self.timings.items())
@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+# The app reads its configuration at import time, so point it at a scratch
+# database before importing it
+_db_dir = tempfile.mkdtemp(prefix='styleme-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ['STYLEME_SCHEMA_CHECK'] = 'migrate'
+os.environ.setdefault('STYLEME_AI_PRELOAD', '')
+os.environ.setdefault('STYLEME_AI_CACHE_MAX_MB', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import app as flask_app  # noqa: E402
+from src.models.user import db, User  # noqa: E402
+from src.models.booking import Salon, Barber, Booking  # noqa: E402
+from src.services import availability, response_cache  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """The app with an empty schema and empty in-process caches."""
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    response_cache.get_cache().invalidate('salons')
+    availability._day_cache._entries.clear()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def foreign_keys(app):
+    """Enforce foreign keys on SQLite, as Postgres always does."""
+    def _enable(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'connect', _enable)
+    engine.dispose()
+    yield
+    event.remove(engine, 'connect', _enable)
+    engine.dispose()
+
+
+@pytest.fixture
+def seed(app):
+    """Two users, an approved salon with two barbers, and a few bookings.
+
+    Returns the ids as a dict.
+    """
+    with app.app_context():
+        users = [User(username=f'user{i}', email=f'user{i}@example.com') for i in range(2)]
+        db.session.add_all(users)
+        db.session.flush()
+        salon = Salon(name='Salon', address='1 Main St', phone='555-0100', email='salon@example.com',
+                      owner_id=users[0].id, is_approved=True)
+        db.session.add(salon)
+        db.session.flush()
+        barbers = [Barber(name=f'barber{i}', salon_id=salon.id) for i in range(2)]
+        db.session.add_all(barbers)
+        db.session.flush()
+        start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        bookings = [
+            Booking(user_id=users[i % 2].id, salon_id=salon.id, barber_id=barbers[i % 2].id,
+                    booking_time=start + timedelta(hours=i), status='pending')
+            for i in range(4)
+        ]
+        db.session.add_all(bookings)
+        db.session.commit()
+        return {
+            'users': [u.id for u in users],
+            'salon': salon.id,
+            'barbers': [b.id for b in barbers],
+            'bookings': [b.id for b in bookings],
+            'start': start,
+        }
+
+
+class QueryCounter:
+    """Counts the SQL statements executed on the primary engine."""
+
+    def __init__(self, app):
+        with app.app_context():
+            self.engine = db.engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+@pytest.fixture
+def count_queries(app):
+    return lambda: QueryCounter(app)
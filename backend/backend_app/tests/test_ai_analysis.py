@@ -0,0 +1,62 @@
+import base64
+import threading
+
+import cv2
+import numpy as np
+
+from src.routes import ai_routes
+from src.services.face_analysis import BatchedFaceAnalyzer
+
+
+def _photo(tag):
+    """A PNG whose pixels all equal ``tag``; lossless, so the tag survives decoding."""
+    ok, png = cv2.imencode('.png', np.full((96, 72, 3), tag, dtype=np.uint8))
+    return 'data:image/png;base64,' + base64.b64encode(png.tobytes()).decode()
+
+
+def _whole_image(img, detector_backend):
+    return [{'face': img[:, :, ::-1] / 255.0, 'facial_area': {'x': 0, 'y': 0, 'w': 72, 'h': 96},
+             'confidence': 1.0}]
+
+
+class BrightestPixelModel:
+    """Predicts class ``brightest pixel``, so each result names the image it came from."""
+
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def predict(self, batch, verbose=0):
+        tags = np.rint(batch.reshape(len(batch), -1).max(axis=1) * 255).astype(int)
+        probs = np.zeros((len(batch), self.outputs))
+        probs[np.arange(len(batch)), tags % self.outputs] = 1.0
+        return probs
+
+
+def test_parallel_requests_get_their_own_results(client, monkeypatch):
+    outputs = {'Age': 101, 'Gender': 2, 'Race': 6, 'Emotion': 7}
+    analyzer = BatchedFaceAnalyzer(ai_routes.ANALYZE_ACTIONS, builder=lambda name: BrightestPixelModel(outputs[name]),
+                                   extract_faces=_whole_image)
+    monkeypatch.setattr(ai_routes, 'get_deepface', lambda: object())
+    monkeypatch.setattr(ai_routes, '_face_analyzer', analyzer)
+
+    tags = [10 + 5 * i for i in range(16)]
+    ages = {}
+    errors = []
+    start = threading.Barrier(len(tags))
+
+    def upload(tag):
+        start.wait()
+        try:
+            response = client.post('/api/ai/analyze_face', json={'image': _photo(tag)})
+            ages[tag] = [face['age'] for face in response.get_json()['analysis']]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=upload, args=(tag,)) for tag in tags]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert ages == {tag: [tag] for tag in tags}
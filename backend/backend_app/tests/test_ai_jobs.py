@@ -0,0 +1,121 @@
+import base64
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+import pytest
+
+from src.services import jobs
+from src.services.executor import TaskResult
+
+
+def _png():
+    ok, png = cv2.imencode('.png', np.full((40, 30, 3), 128, dtype=np.uint8))
+    return png.tobytes()
+
+
+class HeldExecutor:
+    """Executor whose tasks finish only when the test says so."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, data, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def finish_all(self):
+        for future in self.futures:
+            if not future.done():
+                future.set_result(TaskResult(b'\x89PNG-bytes', {'generate': 1.0}, 0.5, 1.0))
+
+
+@pytest.fixture
+def job_queue(monkeypatch):
+    """A fresh process-wide job queue, built from the environment on first use."""
+    monkeypatch.setattr(jobs, '_job_queue', None)
+    yield lambda: jobs.get_job_queue()
+
+
+def _poll(client, url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(url).get_json()
+        if job['finished_at'] is not None:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job did not finish: {job}')
+
+
+def test_async_generation_returns_202_then_the_result(client, job_queue):
+    response = client.post('/api/ai/generate_hairstyle', data=_png(), content_type='image/png',
+                           query_string={'async': '1', 'prompt': 'short bob'})
+    assert response.status_code == 202
+    body = response.get_json()
+
+    job = _poll(client, body['status_url'])
+    assert job['status'] == 'done'
+    assert job['result']['generated_image'].startswith('data:image/png;base64,')
+    assert job['result']['prompt_used'] == 'short bob'
+    image = base64.b64decode(job['result']['generated_image'].split(',')[1])
+    assert cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR).shape == (40, 30, 3)
+
+
+def test_async_job_with_invalid_image_fails(client, job_queue):
+    response = client.post('/api/ai/generate_hairstyle?async=1&prompt=x', data=b'not an image',
+                           content_type='image/jpeg')
+    assert response.status_code == 202
+
+    job = _poll(client, response.get_json()['status_url'])
+    assert job['status'] == 'failed'
+    assert job['error'] == 'Invalid image data'
+
+
+def test_unknown_job_is_404(client, job_queue):
+    assert client.get('/api/ai/jobs/nope').status_code == 404
+    assert client.get('/api/ai/jobs/nope/events').status_code == 404
+
+
+def test_full_queue_returns_429_with_retry_after(client, job_queue, monkeypatch):
+    monkeypatch.setenv('STYLEME_AI_JOB_QUEUE_MAX', '2')
+    executor = HeldExecutor()
+    job_queue()._executor = executor
+    try:
+        statuses = [
+            client.post(f'/api/ai/generate_hairstyle?async=1&prompt=p{i}', data=_png(),
+                        content_type='image/png').status_code
+            for i in range(3)
+        ]
+        response = client.post('/api/ai/modify_hairstyle?async=1&modification_prompt=m', data=_png(),
+                               content_type='image/png')
+    finally:
+        executor.finish_all()
+
+    assert statuses == [202, 202, 429]
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '5'
+    assert job_queue().stats()['rejected'] == 2
+
+
+def test_events_stream_sends_the_result_and_closes(client, job_queue):
+    executor = HeldExecutor()
+    job_queue()._executor = executor
+    response = client.post('/api/ai/generate_hairstyle?async=1&prompt=p', data=_png(), content_type='image/png')
+    events_url = response.get_json()['events_url']
+
+    # Finish the job while the stream is waiting on it
+    threading.Timer(0.2, executor.finish_all).start()
+    events = client.get(events_url)
+    assert events.mimetype == 'text/event-stream'
+    # get_data() only returns once the generator has ended, i.e. the stream closed
+    body = events.get_data(as_text=True)
+
+    assert body.startswith('event: done\ndata: ')
+    assert body.endswith('\n\n') and body.count('event:') == 1
+    job = json.loads(body.split('data: ', 1)[1])
+    assert job['status'] == 'done'
+    assert job['result']['generated_image'] == 'data:image/png;base64,' + base64.b64encode(b'\x89PNG-bytes').decode()
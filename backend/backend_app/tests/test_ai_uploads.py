@@ -0,0 +1,72 @@
+import base64
+import io
+
+import cv2
+import numpy as np
+import pytest
+
+
+def _png():
+    ok, png = cv2.imencode('.png', np.full((40, 30, 3), 128, dtype=np.uint8))
+    return png.tobytes()
+
+
+def _decoded(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _from_json(response, field='generated_image'):
+    prefix, encoded = response.get_json()[field].split(',', 1)
+    return prefix, base64.b64decode(encoded)
+
+
+def test_json_upload_returns_a_png_data_url(client):
+    response = client.post('/api/ai/generate_hairstyle', json={
+        'image': 'data:image/png;base64,' + base64.b64encode(_png()).decode(), 'prompt': 'bob'
+    })
+    assert response.status_code == 200
+    prefix, image = _from_json(response)
+    assert prefix == 'data:image/png;base64'
+    assert _decoded(image).shape == (40, 30, 3)
+    assert response.get_json()['prompt_used'] == 'bob'
+
+
+def test_raw_upload_takes_parameters_from_the_query_string(client):
+    response = client.post('/api/ai/modify_hairstyle', data=_png(), content_type='image/png',
+                           query_string={'modification_prompt': 'shorter'})
+    assert response.status_code == 200
+    assert response.get_json()['modification_used'] == 'shorter'
+    assert _decoded(_from_json(response, 'modified_image')[1]).shape == (40, 30, 3)
+
+
+def test_multipart_upload_takes_parameters_from_form_fields(client):
+    response = client.post('/api/ai/generate_hairstyle', content_type='multipart/form-data', data={
+        'image': (io.BytesIO(_png()), 'photo.png'), 'prompt': 'curls', 'format': 'jpeg'
+    })
+    assert response.status_code == 200
+    prefix, image = _from_json(response)
+    assert prefix == 'data:image/jpeg;base64' and image[:2] == b'\xff\xd8'
+
+
+@pytest.mark.parametrize('accept, query, mimetype', [
+    ('image/png', {}, 'image/png'),
+    ('image/webp', {}, 'image/webp'),
+    ('image/*', {'format': 'jpg'}, 'image/jpeg'),
+])
+def test_binary_output_follows_accept_and_format(client, accept, query, mimetype):
+    response = client.post('/api/ai/generate_hairstyle', data=_png(), content_type='image/png',
+                           headers={'Accept': accept}, query_string={'prompt': 'p', **query})
+    assert response.status_code == 200
+    assert response.mimetype == mimetype
+    assert _decoded(response.get_data()).shape == (40, 30, 3)
+    assert response.headers['X-StyleMe-Note']
+    assert 'generate;dur=' in response.headers['X-StyleMe-Timings']
+
+
+def test_missing_image_or_parameter_is_a_400(client):
+    assert client.post('/api/ai/generate_hairstyle?prompt=p', data=b'', content_type='image/png').status_code == 400
+    assert client.post('/api/ai/generate_hairstyle', data=_png(), content_type='image/png').status_code == 400
+    assert client.post('/api/ai/generate_hairstyle', content_type='multipart/form-data',
+                       data={'prompt': 'p'}).status_code == 400
+    response = client.post('/api/ai/generate_hairstyle?prompt=p', data=b'garbage', content_type='image/jpeg')
+    assert response.status_code == 400 and response.get_json()['error'] == 'Invalid image data'
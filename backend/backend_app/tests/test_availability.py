@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+
+def _free(client, seed, hours=4, **params):
+    """``{barber_id: [minutes after seed['start'], ...]}`` of free slots."""
+    start = seed['start']
+    response = client.get(f"/api/booking/salon/{seed['salon']}/availability", query_string={
+        'from': start.isoformat(), 'to': (start + timedelta(hours=hours)).isoformat(), **params
+    })
+    assert response.status_code == 200, response.get_json()
+    return {
+        b['barber_id']: [
+            int((datetime.fromisoformat(slot) - start).total_seconds() // 60) for slot in b['slots']
+        ]
+        for b in response.get_json()['barbers']
+    }
+
+
+def test_booked_slots_are_not_offered(client, seed):
+    first, second = seed['barbers']
+    # The seed books barber 0 at +0h and +2h, barber 1 at +1h and +3h, 30 minutes each
+    assert _free(client, seed) == {
+        first: [30, 60, 90, 150, 180, 210],
+        second: [0, 30, 90, 120, 150, 210],
+    }
+    # A one-hour appointment must not run into the next booking
+    assert _free(client, seed, duration=60) == {
+        first: [30, 60, 150, 180],
+        second: [0, 90, 120],
+    }
+    assert _free(client, seed, barber_id=second) == {second: [0, 30, 90, 120, 150, 210]}
+
+
+def test_cancelling_frees_the_slot_and_booking_takes_it(client, seed):
+    first = seed['barbers'][0]
+    assert 0 not in _free(client, seed)[first]
+
+    response = client.put(f"/api/booking/booking/{seed['bookings'][0]}/status", json={'status': 'cancelled'})
+    assert response.status_code == 200
+    assert _free(client, seed)[first] == [0, 30, 60, 90, 150, 180, 210]
+
+    response = client.post('/api/booking/book', json={
+        'user_id': seed['users'][1], 'salon_id': seed['salon'], 'barber_id': first,
+        'booking_time': (seed['start'] + timedelta(minutes=180)).isoformat(),
+    })
+    assert response.status_code == 201
+    assert _free(client, seed)[first] == [0, 30, 60, 90, 150, 210]
+
+
+def test_invalid_ranges_are_rejected(client, seed):
+    url = f"/api/booking/salon/{seed['salon']}/availability"
+    start = seed['start']
+    assert client.get(url, query_string={'from': start.isoformat(), 'to': start.isoformat()}).status_code == 400
+    assert client.get(url, query_string={'from': start.isoformat(),
+                                         'to': (start + timedelta(days=30)).isoformat()}).status_code == 400
+    assert client.get(url, query_string={'from': 'tomorrow'}).status_code == 400
+    assert client.get(url, query_string={'duration': 0}).status_code == 400
+    assert client.get('/api/booking/salon/9999/availability').status_code == 404
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.services.batching import BatchScheduler
+from src.services.face_analysis import BatchedFaceAnalyzer
+
+OUTPUTS = {'Age': 101, 'Gender': 2, 'Race': 6, 'Emotion': 7}
+
+
+def _image(tag):
+    """A 'photo' whose pixels all equal ``tag``, so results can be traced back to it."""
+    return np.full((64, 48, 3), tag, dtype=np.uint8)
+
+
+def _one_face(img, detector_backend):
+    # extract_faces returns RGB floats in [0, 1]
+    return [{'face': img[:, :, ::-1] / 255.0, 'facial_area': {'x': 0, 'y': 0, 'w': 48, 'h': 64},
+             'confidence': 0.9}]
+
+
+class TaggingModel:
+    """Puts all the probability on class ``round(mean pixel)``, and records batch sizes."""
+
+    def __init__(self, outputs, calls):
+        self.outputs = outputs
+        self.calls = calls
+
+    def predict(self, batch, verbose=0):
+        self.calls.append(len(batch))
+        means = batch.reshape(len(batch), -1).mean(axis=1) * 255
+        # Letterboxing a 64x48 face pads a quarter of the 3-channel input black
+        tags = np.rint(means * 224 / 168 if batch.shape[-1] == 3 else means).astype(int)
+        probs = np.zeros((len(batch), self.outputs))
+        probs[np.arange(len(batch)), tags % self.outputs] = 1.0
+        return probs
+
+
+def _analyzer(calls, **kwargs):
+    return BatchedFaceAnalyzer(
+        ['age', 'gender', 'race', 'emotion'],
+        builder=lambda name: TaggingModel(OUTPUTS[name], calls.setdefault(name, [])),
+        extract_faces=kwargs.pop('extract_faces', _one_face),
+        **kwargs
+    )
+
+
+def test_models_run_once_per_batch_and_results_match_their_images():
+    calls = {}
+    tags = [10, 20, 30, 40, 50]
+    results = _analyzer(calls).analyze([_image(t) for t in tags])
+
+    assert calls == {'Age': [5], 'Gender': [5], 'Race': [5], 'Emotion': [5]}
+    for tag, faces in zip(tags, results):
+        assert len(faces) == 1
+        assert faces[0]['age'] == pytest.approx(tag)
+        assert faces[0]['dominant_gender'] == ['Woman', 'Man'][tag % 2]
+        assert faces[0]['emotion'][faces[0]['dominant_emotion']] == pytest.approx(100.0)
+        assert faces[0]['region']['h'] == 64
+
+
+def test_failed_detection_only_fails_its_image():
+    def extract(img, detector_backend):
+        if img[0, 0, 0] == 20:
+            raise ValueError('unreadable')
+        return _one_face(img, detector_backend)
+
+    results = _analyzer({}, extract_faces=extract).analyze([_image(10), _image(20), _image(30)])
+    assert isinstance(results[1], ValueError)
+    assert [r[0]['age'] for r in (results[0], results[2])] == [pytest.approx(10), pytest.approx(30)]
+
+
+def test_falls_back_to_per_image_analysis():
+    def broken(name):
+        raise AttributeError('no predict')
+
+    analyzed = []
+    analyzer = BatchedFaceAnalyzer(['age'], builder=broken, extract_faces=_one_face,
+                                   analyze_one=lambda img, actions: analyzed.append(img) or [{'age': 1}])
+    assert analyzer.analyze([_image(1), _image(2)]) == [[{'age': 1}], [{'age': 1}]]
+    assert len(analyzed) == 2 and analyzer.batched_error == 'no predict'
+    # Later batches skip the batched path
+    analyzer.analyze([_image(3)])
+    assert len(analyzed) == 3
+
+
+class DenseModel:
+    """Stand-in CPU model: a pooled two-layer dense network."""
+
+    def __init__(self, outputs):
+        rng = np.random.default_rng(0)
+        self.w1 = rng.standard_normal((56 * 56 * 3, 512), dtype=np.float32)
+        self.w2 = rng.standard_normal((512, outputs), dtype=np.float32)
+
+    def predict(self, batch, verbose=0):
+        if batch.shape[-1] == 1:
+            batch = np.repeat(np.repeat(batch, 7, axis=1), 7, axis=2).repeat(3, axis=3)[:, :56, :56]
+        else:
+            batch = batch.reshape(len(batch), 56, 4, 56, 4, 3).mean(axis=(2, 4))
+        hidden = np.maximum(batch.reshape(len(batch), -1) @ self.w1, 0)
+        logits = hidden @ self.w2
+        logits -= logits.max(axis=1, keepdims=True)
+        return np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+
+
+def _throughput(models, concurrency, per_caller, max_batch_size):
+    analyzer = BatchedFaceAnalyzer(['age', 'gender', 'race', 'emotion'],
+                                   builder=models.__getitem__, extract_faces=_one_face)
+    scheduler = BatchScheduler(analyzer.analyze, max_batch_size=max_batch_size, max_wait_ms=5)
+    image = np.random.default_rng(concurrency).integers(0, 255, (320, 240, 3), dtype=np.uint8)
+
+    def caller():
+        for _ in range(per_caller):
+            scheduler.submit(image)
+
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return concurrency * per_caller / (time.perf_counter() - started), scheduler.stats()['avg_batch_size']
+
+
+def test_throughput_by_concurrency_benchmark():
+    """Images/sec against concurrent callers, on CPU. Run with ``-s`` to see the table."""
+    models = {name: DenseModel(n) for name, n in OUTPUTS.items()}
+    print('\nconcurrency  unbatched img/s  batched img/s  avg batch')
+    batch_sizes = {}
+    for concurrency in (1, 2, 4, 8, 16):
+        unbatched, _ = _throughput(models, concurrency, 6, max_batch_size=1)
+        batched, batch_sizes[concurrency] = _throughput(models, concurrency, 6, max_batch_size=8)
+        print(f"{concurrency:>11}  {unbatched:>15.1f}  {batched:>13.1f}  {batch_sizes[concurrency]:>9}")
+
+    assert batch_sizes[1] == 1
+    assert batch_sizes[8] > 1
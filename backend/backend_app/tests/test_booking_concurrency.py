@@ -0,0 +1,57 @@
+import random
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from src.models.booking import Booking, BarberSlot
+from src.services.slots import slot_cells
+
+THREADS = 8
+REQUESTS_PER_THREAD = 25
+
+
+def test_concurrent_bookings_never_double_book(client, seed):
+    """Many threads booking overlapping times must never double-book a barber."""
+    app = client.application
+    base = seed['start'] + timedelta(days=1)
+    statuses = Counter()
+    errors = []
+    lock = threading.Lock()
+    start_together = threading.Barrier(THREADS)
+
+    def book(worker):
+        rng = random.Random(worker)
+        thread_client = app.test_client()
+        start_together.wait()
+        for _ in range(REQUESTS_PER_THREAD):
+            response = thread_client.post('/api/booking/book', json={
+                'user_id': seed['users'][0],
+                'salon_id': seed['salon'],
+                'barber_id': rng.choice(seed['barbers']),
+                # Overlapping 30-90 minute appointments within a 3 hour window
+                'booking_time': (base + timedelta(minutes=15 * rng.randrange(12))).isoformat(),
+                'duration_minutes': rng.choice((30, 60, 90)),
+            })
+            with lock:
+                statuses[response.status_code] += 1
+                if response.status_code not in (201, 409):
+                    errors.append(response.get_json())
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert statuses[201] > 0 and statuses[409] > 0
+
+    with app.app_context():
+        bookings = Booking.query.filter(Booking.booking_time >= base).all()
+        assert len(bookings) == statuses[201]
+        held = Counter()
+        for booking in bookings:
+            for cell_start, _ in slot_cells(booking.booking_time, booking.duration_minutes):
+                held[(booking.barber_id, cell_start)] += 1
+        assert max(held.values()) == 1
+        assert BarberSlot.query.filter(BarberSlot.slot_start >= base).count() == len(held)
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from src.models.user import db, User
+from src.models.booking import Barber, Booking
+
+
+def _add_bookings(app, seed, n, prefix):
+    """``n`` bookings today, each with its own user and barber, so lazy loads could not be shared,
+    and ``n`` more for the first seeded user, each with its own barber."""
+    with app.app_context():
+        users = [User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com') for i in range(n)]
+        users += [db.session.get(User, seed['users'][0])] * n
+        barbers = [Barber(name=f'{prefix}{i}', salon_id=seed['salon']) for i in range(2 * n)]
+        db.session.add_all(users + barbers)
+        db.session.flush()
+        today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        db.session.add_all([
+            Booking(user_id=user.id, salon_id=seed['salon'], barber_id=barber.id,
+                    booking_time=today + timedelta(minutes=i), status='pending')
+            for i, (user, barber) in enumerate(zip(users, barbers))
+        ])
+        db.session.commit()
+
+
+def test_booking_listings_use_a_constant_number_of_queries(app, client, seed, count_queries):
+    listings = [
+        f"/api/booking/bookings/{seed['users'][0]}",
+        f"/api/booking/salon/{seed['salon']}/bookings",
+        '/api/admin/admin/bookings',
+        f"/api/salon/salon/{seed['salon']}/dashboard",
+    ]
+
+    def queries(path):
+        with count_queries() as counter:
+            response = client.get(path)
+        assert response.status_code == 200
+        return counter.count, len(response.get_data())
+
+    _add_bookings(app, seed, 2, 'few')
+    few = {path: queries(path) for path in listings}
+    _add_bookings(app, seed, 30, 'many')
+    many = {path: queries(path) for path in listings}
+
+    # Every listing grew, and its query count did not
+    assert all(many[path][1] > few[path][1] for path in listings)
+    assert {path: count for path, (count, _) in many.items()} == {path: count for path, (count, _) in few.items()}
@@ -0,0 +1,70 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from src.models.user import db
+from src.models.booking import Booking
+from src.models.stats import BookingDailyStats, DashboardCounter
+from src.services import booking_stats
+from src.services.booking_stats import BACKFILLED, apply_stats_deltas
+from src.services.counters import reconcile_counters
+
+
+def _as_upgraded_database(app, seed, count=10):
+    """Bookings written before the rollup existed: no rollup rows, no marker."""
+    with app.app_context():
+        now = datetime.now()
+        db.session.add_all([
+            Booking(user_id=seed['users'][0], salon_id=seed['salon'],
+                    booking_time=now - timedelta(days=i + 1), status='completed')
+            for i in range(count)
+        ])
+        db.session.commit()
+        BookingDailyStats.query.delete()
+        DashboardCounter.query.filter_by(name=BACKFILLED).delete()
+        db.session.commit()
+        return Booking.query.count()
+
+
+def test_history_is_backfilled_after_a_new_booking(client, seed):
+    existing = _as_upgraded_database(client.application, seed)
+
+    # The first booking after deploy adds a rollup row before analytics run
+    response = client.post('/api/booking/book', json={
+        'user_id': seed['users'][0],
+        'salon_id': seed['salon'],
+        'booking_time': datetime.now().isoformat(),
+    })
+    assert response.status_code == 201
+
+    admin = client.get('/api/admin/admin/analytics?days=60').get_json()
+    salon = client.get(f"/api/salon/salon/{seed['salon']}/analytics?days=60").get_json()
+    expected = existing + 1
+    assert sum(day['count'] for day in admin['daily_bookings']) == expected
+    assert sum(salon['status_breakdown'].values()) == expected
+
+
+def test_backfill_marker_survives_counter_reconcile(app, seed):
+    with app.app_context():
+        client = app.test_client()
+        client.get('/api/admin/admin/analytics')
+        reconcile_counters()
+        assert db.session.get(DashboardCounter, BACKFILLED) is not None
+
+
+def test_analytics_report_the_clamped_window(client, seed):
+    assert client.get('/api/admin/admin/analytics?days=100000').get_json()['days'] == 365
+    assert client.get(f"/api/salon/salon/{seed['salon']}/analytics?days=0").get_json()['days'] == 1
+
+
+def test_rollup_deltas_are_applied_in_key_order(app, monkeypatch):
+    written = []
+    monkeypatch.setattr(booking_stats, 'upsert_increment',
+                        lambda connection, table, keys, delta, column: written.append(tuple(keys.values())))
+    deltas = Counter()
+    deltas[(2, date(2026, 1, 2), 'pending')] -= 1
+    deltas[(2, date(2026, 1, 2), 'confirmed')] += 1
+    deltas[(1, date(2026, 1, 3), 'pending')] += 1
+    deltas[(1, date(2026, 1, 1), 'pending')] += 1
+    with app.app_context():
+        apply_stats_deltas(db.session.connection(), deltas)
+    assert written == sorted(deltas)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from src.models.user import db
+from src.models.booking import Salon, Barber, Booking
+
+
+def test_bulk_create_reports_missing_and_mismatched_references(app, client, seed, count_queries):
+    with app.app_context():
+        other = Salon(name='Other', address='2 Main St', phone='555-0101', email='other@example.com',
+                      owner_id=seed['users'][0], is_approved=True)
+        db.session.add(other)
+        db.session.flush()
+        stranger = Barber(name='stranger', salon_id=other.id)
+        db.session.add(stranger)
+        db.session.commit()
+        stranger_id = stranger.id
+
+    when = (seed['start'] + timedelta(days=3)).isoformat()
+    user, salon, barber = seed['users'][0], seed['salon'], seed['barbers'][0]
+    items = [
+        {'user_id': user, 'salon_id': salon, 'barber_id': barber, 'booking_time': when},
+        {'user_id': 9999, 'salon_id': salon, 'booking_time': when},
+        {'user_id': user, 'salon_id': 9999, 'booking_time': when},
+        {'user_id': user, 'salon_id': salon, 'barber_id': 9999, 'booking_time': when},
+        {'user_id': user, 'salon_id': salon, 'barber_id': stranger_id, 'booking_time': when},
+        {'user_id': '1', 'salon_id': salon, 'booking_time': when},
+    ]
+    with app.app_context():
+        before = Booking.query.count()
+
+    response = client.post('/api/booking/bookings', json={'bookings': items})
+
+    assert response.status_code == 207
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == [201, 404, 404, 404, 400, 400]
+    assert [r.get('error') for r in results[1:]] == [
+        'User not found', 'Salon not found', 'Barber not found',
+        'The barber does not work at this salon', 'user_id must be an integer',
+    ]
+    with app.app_context():
+        assert Booking.query.count() == before + 1
+
+
+def test_bulk_create_checks_references_per_table_not_per_item(client, seed, count_queries):
+    when = (seed['start'] + timedelta(days=3)).isoformat()
+
+    def queries(n):
+        items = [{'user_id': 10000 + i, 'salon_id': 20000 + i, 'barber_id': 30000 + i, 'booking_time': when}
+                 for i in range(n)]
+        with count_queries() as counter:
+            response = client.post('/api/booking/bookings', json={'bookings': items})
+        assert [r['status'] for r in response.get_json()['results']] == [404] * n
+        return counter.count
+
+    assert queries(1) == queries(50)
+
+
+def test_bulk_status_update_rejects_ids_that_are_not_integers(client, seed):
+    first, second = seed['bookings'][:2]
+    response = client.patch('/api/booking/bookings/status',
+                            json={'ids': [[1], first, True, {'id': 1}, '2'], 'status': 'confirmed'})
+
+    assert response.status_code == 207
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == [400, 200, 400, 400, 400]
+    assert results[0]['error'] == 'id must be an integer'
+
+    response = client.patch('/api/booking/bookings/status', json={'updates': [
+        {'id': second, 'status': 'cancelled'}, {'id': [second], 'status': 'cancelled'}, {'status': 'cancelled'},
+    ]})
+    assert [r['status'] for r in response.get_json()['results']] == [200, 400, 400]
+
+    response = client.patch('/api/booking/bookings/status', json={'ids': 5, 'status': 'confirmed'})
+    assert response.status_code == 400
@@ -0,0 +1,56 @@
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('cv2', 'numpy', 'deepface', 'tensorflow')
+
+# Generous for slow CI machines; importing numpy + OpenCV alone takes about
+# this long, and DeepFace/TensorFlow several seconds
+IMPORT_BUDGET_MS = 3000
+
+
+def _import_main(tmp_path, roles):
+    """Import ``src.main`` in a fresh interpreter under ``-X importtime``.
+
+    Returns ``(heavy modules loaded, cumulative import time of src.main in ms)``.
+    """
+    env = dict(
+        os.environ,
+        STYLEME_ROLES=roles,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'cold-start.db'}",
+        # Only the import path is measured here; see test_migrations for the schema check
+        STYLEME_SCHEMA_CHECK='off',
+        STYLEME_AI_PRELOAD='',
+    )
+    code = f"import sys, src.main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    # Lines look like "import time:  self [us] | cumulative | module"
+    cumulative = {
+        match.group(2).strip(): int(match.group(1))
+        for match in re.finditer(r'^import time:\s+\d+ \|\s+(\d+) \| (.+)$', result.stderr, re.MULTILINE)
+    }
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return loaded, cumulative['src.main'] / 1000.0
+
+
+def test_booking_workers_do_not_import_the_ai_stack(tmp_path):
+    loaded, import_ms = _import_main(tmp_path, 'booking,admin')
+    print(f"\nimport src.main (booking,admin): {import_ms:.0f} ms")
+
+    assert loaded == []
+    assert import_ms < IMPORT_BUDGET_MS
+
+
+def test_ai_blueprint_defers_the_ai_stack_to_first_use(tmp_path):
+    loaded, import_ms = _import_main(tmp_path, 'booking,admin,ai')
+    print(f"\nimport src.main (booking,admin,ai): {import_ms:.0f} ms")
+
+    assert loaded == []
+    assert import_ms < IMPORT_BUDGET_MS
@@ -0,0 +1,48 @@
+from src.models.user import db, User
+from src.models.booking import Booking
+from src.services import counters
+
+
+def test_counter_upserts_run_in_key_order(app, seed, monkeypatch):
+    written = []
+    upsert = counters.upsert_increment
+    monkeypatch.setattr(counters, 'upsert_increment',
+                        lambda connection, table, keys, delta: written.append(keys['name']) or upsert(connection, table, keys, delta))
+    with app.app_context():
+        # One flush writing both a user and a booking
+        db.session.add(User(username='late', email='late@example.com'))
+        db.session.add(Booking(user_id=seed['users'][0], salon_id=seed['salon'], booking_time=seed['start'],
+                               status='pending'))
+        db.session.commit()
+
+    assert len(written) == 4
+    assert written == sorted(written)
+
+
+def test_reconcile_tolerates_a_concurrent_first_seed(app, seed, monkeypatch):
+    Counter = counters.DashboardCounter
+    with app.app_context():
+        Counter.query.delete()
+        db.session.commit()
+
+    class RacingQuery:
+        """Lets another request seed the table right after this one found it empty."""
+
+        def __init__(self, query):
+            self.query = query
+
+        def all(self):
+            rows = self.query.all()
+            with db.engine.begin() as connection:
+                for name in (counters.INITIALIZED, counters.USERS):
+                    connection.execute(Counter.__table__.insert().values(name=name, value=1))
+            return rows
+
+    with app.app_context():
+        with monkeypatch.context() as patch:
+            patch.setattr(Counter, 'query', RacingQuery(Counter.query))
+            counters.reconcile_counters()
+        values = counters.read_dashboard_counters()
+
+    assert values['total_users'] == 2
+    assert values['total_bookings'] == 4
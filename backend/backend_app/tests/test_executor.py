@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from src.services import executor as executor_module
+from src.services.executor import ImageExecutor, default_workers
+
+
+def _double(buffer):
+    return np.asarray(buffer) * 2, {'pid': 'inline-or-worker'}
+
+
+def test_serverless_defaults_to_inline(monkeypatch):
+    monkeypatch.setenv('VERCEL', '1')
+    assert default_workers() == 0
+    monkeypatch.delenv('VERCEL')
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'styleme')
+    assert default_workers() == 0
+
+
+def test_falls_back_inline_when_shared_memory_is_unavailable(monkeypatch):
+    def no_shm(*args, **kwargs):
+        raise OSError(38, 'Function not implemented')
+
+    monkeypatch.setattr(executor_module.shared_memory, 'SharedMemory', no_shm)
+    pool = ImageExecutor(max_workers=2, prefork=False)
+
+    data = np.arange(6, dtype=np.uint8).reshape(2, 3)
+    first = pool.run(_double, data)
+    second = pool.run(_double, data)
+
+    assert (first.output == data * 2).all() and (second.output == data * 2).all()
+    stats = pool.stats()
+    assert stats['workers'] == 0
+    assert 'Function not implemented' in stats['pool_error']
+    assert stats['tasks'] == 2 and stats['failures'] == 0
+
+
+def _die_once(buffer, marker):
+    # Simulates an OOM kill or segfault of the worker running the first attempt
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return np.asarray(buffer) + 1, os.getpid()
+
+
+def test_pool_recovers_after_a_worker_dies(tmp_path):
+    pool = ImageExecutor(max_workers=2, prefork=False)
+    data = np.zeros(4, dtype=np.uint8)
+
+    # The task whose worker died is retried on a fresh pool
+    first = pool.run(_die_once, data, str(tmp_path / 'died-once'), timeout=60)
+    assert (first.output == 1).all()
+    # And the pool keeps serving tasks afterwards
+    second = pool.run(_double, data + 3, timeout=60)
+    assert (second.output == 6).all()
+
+    stats = pool.stats()
+    assert stats['pool_restarts'] == 1
+    assert stats['failures'] == 0 and stats['in_flight'] == 0
+
+
+def test_broken_pool_is_replaced_before_the_next_task():
+    pool = ImageExecutor(max_workers=1, prefork=False)
+    data = np.ones(2, dtype=np.uint8)
+    pool.run(_double, data, timeout=60)
+
+    # Kill the idle worker, as an OOM killer would between requests
+    for process in list(pool._pool._processes.values()):
+        process.kill()
+        process.join()
+
+    result = pool.run(_double, data, timeout=60)
+    assert (result.output == 2).all()
+    assert pool.stats()['pool_restarts'] == 1
@@ -0,0 +1,61 @@
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from src.services import export
+
+
+def test_bookings_csv_has_a_header_and_every_booking(client, seed):
+    response = client.get('/api/admin/admin/export/bookings')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="bookings-')
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [int(r['id']) for r in rows] == seed['bookings']
+    assert rows[0]['booking_time'] == seed['start'].isoformat()
+    assert rows[0]['user_name'] == 'user0' and rows[1]['barber_name'] == 'barber1'
+
+
+def test_users_ndjson_counts_bookings(client, seed):
+    response = client.get('/api/admin/admin/export/users?format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    users = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(u['username'], u['bookings_count']) for u in users] == [('user0', 2), ('user1', 2)]
+
+
+def test_range_filters_bookings(client, seed):
+    start = seed['start']
+    response = client.get('/api/admin/admin/export/bookings', query_string={
+        'format': 'ndjson', 'from': (start + timedelta(hours=1)).isoformat(),
+        'to': (start + timedelta(hours=3)).isoformat(),
+    })
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == seed['bookings'][1:3]
+
+
+def test_export_streams_in_batches(client, seed, monkeypatch):
+    monkeypatch.setattr(export, 'EXPORT_BATCH_ROWS', 1)
+    response = client.get('/api/admin/admin/export/bookings?format=ndjson', buffered=False)
+    assert response.is_streamed
+    chunks = [chunk for chunk in response.response if chunk]
+    response.close()
+    # One chunk per batch of rows rather than one body
+    assert len(chunks) == 4
+    assert all(chunk.count(b'\n') == 1 for chunk in chunks)
+
+
+def test_gzip_is_applied_to_the_stream(client, seed):
+    plain = client.get('/api/admin/admin/export/bookings').get_data()
+    response = client.get('/api/admin/admin/export/bookings', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()) == plain
+
+
+def test_invalid_arguments_are_a_400(client, seed):
+    response = client.get('/api/admin/admin/export/bookings?format=xlsx')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'format must be one of: csv, ndjson'
+    assert client.get('/api/admin/admin/export/users?from=yesterday').status_code == 400
+    assert client.get('/api/admin/admin/export/users?from=2030-01-02&to=2030-01-01').status_code == 400
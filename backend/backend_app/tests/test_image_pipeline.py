@@ -0,0 +1,113 @@
+import io
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from src.services import image_pipeline
+from src.services.image_pipeline import adjust_brightness_contrast, decode_for_inference, encode_image
+
+
+def _jpeg(width, height, orientation=None, seed=0):
+    """A JPEG whose left half is red and right half blue, plus mild noise."""
+    rgb = np.zeros((height, width, 3), dtype=np.uint8)
+    rgb[:, :width // 2] = (220, 30, 30)
+    rgb[:, width // 2:] = (30, 30, 220)
+    noise = np.random.default_rng(seed).integers(-10, 10, rgb.shape)
+    image = Image.fromarray(np.clip(rgb.astype(int) + noise, 0, 255).astype(np.uint8))
+    buffer = io.BytesIO()
+    if orientation is None:
+        image.save(buffer, 'JPEG', quality=90)
+    else:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, 'JPEG', quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+def _is_red(pixels):
+    b, g, r = pixels.reshape(-1, 3).mean(axis=0)
+    return r > 150 and b < 100
+
+
+def test_exif_orientation_is_applied():
+    # Orientation 6: the camera was rotated, the pixels must be turned 90 degrees clockwise
+    img = decode_for_inference(_jpeg(120, 80, orientation=6), limit=1024)
+    assert img.shape[:2] == (120, 80)
+    # The stored left (red) half ends up on top
+    assert _is_red(img[:50]) and not _is_red(img[70:])
+
+    upright = decode_for_inference(_jpeg(120, 80), limit=1024)
+    assert upright.shape[:2] == (80, 120)
+    assert _is_red(upright[:, :50]) and not _is_red(upright[:, 70:])
+
+
+@pytest.mark.parametrize('limit, flag', [
+    (100, cv2.IMREAD_REDUCED_COLOR_8),
+    (200, cv2.IMREAD_REDUCED_COLOR_4),
+    (400, cv2.IMREAD_REDUCED_COLOR_2),
+    (500, cv2.IMREAD_COLOR),
+])
+def test_reduced_decode_is_chosen_from_the_target_size(monkeypatch, limit, flag):
+    used = []
+    imdecode = cv2.imdecode
+    monkeypatch.setattr(image_pipeline.cv2, 'imdecode',
+                        lambda buf, flags: used.append(flags) or imdecode(buf, flags))
+
+    img = decode_for_inference(_jpeg(800, 600), limit=limit)
+
+    assert used == [flag | cv2.IMREAD_IGNORE_ORIENTATION]
+    # The reduced decode never goes below the limit; the resize lands on it exactly
+    assert max(img.shape[:2]) == limit
+
+
+def test_lut_matches_pil_image_enhance():
+    rng = np.random.default_rng(1)
+    gradient = np.linspace(0, 255, 256, dtype=np.float32)[None, :, None]
+    rgb = np.clip(gradient + rng.normal(0, 25, (128, 256, 3)), 0, 255).astype(np.uint8)
+
+    pil = ImageEnhance.Contrast(ImageEnhance.Brightness(Image.fromarray(rgb)).enhance(1.1)).enhance(1.05)
+    expected = np.asarray(pil).astype(int)
+    actual = cv2.cvtColor(adjust_brightness_contrast(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), 1.1, 1.05),
+                          cv2.COLOR_BGR2RGB).astype(int)
+
+    assert np.abs(actual - expected).max() <= 2
+
+
+def _pil_pipeline(img_bytes):
+    """The pre-pipeline path: full-size decode, PIL round trip, two enhancer copies, PNG."""
+    img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+    pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    pil = ImageEnhance.Contrast(ImageEnhance.Brightness(pil).enhance(1.1)).enhance(1.05)
+    out = io.BytesIO()
+    pil.save(out, 'PNG')
+    return out.getvalue()
+
+
+def _new_pipeline(img_bytes):
+    return encode_image(adjust_brightness_contrast(decode_for_inference(img_bytes, limit=1024)), 'png')
+
+
+def _measure(fn, img_bytes):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(img_bytes)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2 ** 20
+
+
+def test_latency_and_memory_benchmark():
+    """Phone-sized upload through the old and new paths. Run with ``-s`` to see the numbers."""
+    img_bytes = _jpeg(3264, 2448)
+    old_ms, old_mb = _measure(_pil_pipeline, img_bytes)
+    new_ms, new_mb = _measure(_new_pipeline, img_bytes)
+    print(f"\n8MP JPEG -> PNG: PIL path {old_ms:.0f} ms, {old_mb:.1f} MB peak; "
+          f"pipeline {new_ms:.0f} ms, {new_mb:.1f} MB peak")
+
+    assert new_mb < old_mb / 2
+    assert new_ms < old_ms
@@ -0,0 +1,58 @@
+from datetime import date
+
+from sqlalchemy import func, inspect
+
+from src.models.user import db
+from src.models.booking import Booking
+from src.services.booking_queries import booking_time_in_days
+from src.services.schema import create_missing_indexes
+
+
+def _plan(query):
+    """SQLite's EXPLAIN QUERY PLAN for an ORM query, as one string."""
+    compiled = query.statement.compile(db.engine)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params)
+    return ' | '.join(row[-1] for row in rows)
+
+
+def test_dashboard_filters_use_the_booking_indexes(app):
+    today = date(2026, 1, 15)
+    with app.app_context():
+        expected = {
+            # Salon dashboard: today's bookings, and the pending list
+            'ix_booking_salon_id_booking_time': Booking.query.filter(
+                Booking.salon_id == 1, booking_time_in_days(today)),
+            'ix_booking_salon_id_status': Booking.query.filter(
+                Booking.salon_id == 1, Booking.status == 'pending'),
+            # A user's bookings, newest first
+            'ix_booking_user_id_booking_time': Booking.query.filter(
+                Booking.user_id == 1).order_by(Booking.booking_time.desc()),
+            # One status over a date range (the admin analytics windows)
+            'ix_booking_status_booking_time': Booking.query.filter(
+                Booking.status == 'pending', booking_time_in_days(today, date(2026, 1, 21))),
+        }
+        for index, query in expected.items():
+            plan = _plan(query)
+            assert f'INDEX {index} ' in plan, plan
+
+
+def test_wrapping_booking_time_in_a_function_cannot_range_scan(app):
+    with app.app_context():
+        plan = _plan(Booking.query.filter(func.date(Booking.booking_time) == '2026-01-15'))
+        assert 'booking_time>' not in plan and 'booking_time<' not in plan
+        plan = _plan(Booking.query.filter(booking_time_in_days(date(2026, 1, 15))))
+        assert 'booking_time>? AND booking_time<?' in plan, plan
+
+
+def test_missing_indexes_are_created_on_existing_databases(app):
+    with app.app_context():
+        db.session.remove()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('DROP INDEX ix_booking_salon_id_status')
+            conn.exec_driver_sql('DROP INDEX ix_booking_status_booking_time')
+
+        assert sorted(create_missing_indexes()) == ['ix_booking_salon_id_status', 'ix_booking_status_booking_time']
+        names = {ix['name'] for ix in inspect(db.engine).get_indexes('booking')}
+        assert {'ix_booking_salon_id_status', 'ix_booking_status_booking_time'} <= names
+        assert create_missing_indexes() == []
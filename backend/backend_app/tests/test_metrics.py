@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+
+
+def _scrape(client):
+    """``{'name{labels}': value}`` from ``/api/metrics``."""
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            key, value = line.rsplit(' ', 1)
+            samples[key] = float(value)
+    return samples, response.get_data(as_text=True)
+
+
+def _request(client, method, path, **kwargs):
+    # Metrics are recorded when the server closes the response, as it does
+    # once the body has been sent; the test client leaves that to the caller
+    response = client.open(path, method=method, **kwargs)
+    response.close()
+    return response
+
+
+def _delta(before, after, key):
+    return after.get(key, 0) - before.get(key, 0)
+
+
+def test_requests_are_recorded_per_route(client, seed):
+    route = 'method="GET",route="/api/booking/salon/<int:salon_id>"'
+    before, _ = _scrape(client)
+    _request(client, 'GET', f"/api/booking/salon/{seed['salon']}")
+    _request(client, 'GET', f"/api/booking/salon/{seed['salon']}")
+    missing = _request(client, 'GET', '/api/booking/salon/9999').status_code
+    _request(client, 'GET', '/no/such/page')
+    after, text = _scrape(client)
+
+    assert _delta(before, after, f'styleme_http_request_duration_seconds_count{{{route},status="200"}}') == 2
+    assert _delta(before, after, f'styleme_http_request_duration_seconds_count{{{route},status="{missing}"}}') == 1
+    assert _delta(before, after, 'styleme_http_request_duration_seconds_count'
+                                 '{method="GET",route="unmatched",status="404"}') == 1
+    assert _delta(before, after, f'styleme_http_response_size_bytes_count{{{route}}}') == 3
+    # The second request is a cache hit that runs no SQL
+    assert _delta(before, after, f'styleme_db_queries_per_request_bucket{{{route},le="0"}}') >= 1
+    assert _delta(before, after, f'styleme_db_queries_per_request_sum{{{route}}}') >= 1
+
+    for name, kind in [('styleme_http_request_duration_seconds', 'histogram'),
+                       ('styleme_db_time_per_request_seconds', 'histogram')]:
+        assert f'# TYPE {name} {kind}' in text
+
+
+def test_buckets_are_cumulative_and_end_with_the_count(client, seed):
+    _request(client, 'GET', '/api/booking/salons')
+    samples, _ = _scrape(client)
+    labels = 'method="GET",route="/api/booking/salons"'
+    buckets = [(key, value) for key, value in samples.items()
+               if key.startswith(f'styleme_http_response_size_bytes_bucket{{{labels},')]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts)
+    assert buckets[-1][0].endswith('le="+Inf"}')
+    assert counts[-1] == samples[f'styleme_http_response_size_bytes_count{{{labels}}}']
+
+
+def test_ai_stages_are_recorded(client):
+    ok, png = cv2.imencode('.png', np.full((40, 30, 3), 128, dtype=np.uint8))
+    before, _ = _scrape(client)
+    response = _request(client, 'POST', '/api/ai/generate_hairstyle?prompt=p', data=png.tobytes(),
+                        content_type='image/png')
+    assert response.status_code == 200
+    after, _ = _scrape(client)
+
+    for stage in ('queue', 'decode', 'generate', 'encode'):
+        assert _delta(before, after, f'styleme_ai_stage_duration_seconds_count{{stage="{stage}"}}') == 1
@@ -0,0 +1,111 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db
+from src.services import migrations
+from src.services.migrations import LATEST_VERSION, MIGRATIONS, check_schema, current_version, migrate
+
+
+def _drop_everything():
+    db.drop_all()
+    migrations.schema_version.drop(bind=db.engine, checkfirst=True)
+
+
+def test_unversioned_database_is_migrated_at_startup(app, monkeypatch):
+    monkeypatch.setenv('STYLEME_SCHEMA_CHECK', 'warn')
+    with app.app_context():
+        _drop_everything()
+        assert current_version() == 0
+
+        assert check_schema() == LATEST_VERSION
+        assert current_version() == LATEST_VERSION
+        assert {'user', 'salon', 'barber', 'booking'} <= set(inspect(db.engine).get_table_names())
+
+
+def test_behind_database_only_warns(app, monkeypatch):
+    monkeypatch.setenv('STYLEME_SCHEMA_CHECK', 'warn')
+    monkeypatch.setattr(migrations, 'LATEST_VERSION', LATEST_VERSION + 1)
+    with app.app_context():
+        migrate()
+        assert check_schema() == LATEST_VERSION
+
+
+def _cold_start(path, startup):
+    """Statements and seconds one process start spends on the schema."""
+    engine = create_engine(f'sqlite:///{path}')
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    started = time.perf_counter()
+    startup(engine)
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return len(statements), elapsed
+
+
+def test_cold_start_benchmark(app, tmp_path):
+    """Versioned startup check against the old ``create_all()`` at import.
+
+    Run with ``-s`` to see the numbers.
+    """
+    path = tmp_path / 'cold-start.db'
+    migrate(create_engine(f'sqlite:///{path}'))
+
+    runs = 20
+    create_all = [_cold_start(path, lambda engine: db.metadata.create_all(bind=engine)) for _ in range(runs)]
+    version_check = [_cold_start(path, current_version) for _ in range(runs)]
+
+    create_all_queries, version_queries = create_all[0][0], version_check[0][0]
+    create_all_ms = sorted(t for _, t in create_all)[runs // 2] * 1000
+    version_ms = sorted(t for _, t in version_check)[runs // 2] * 1000
+    print(f"\ncold start, median of {runs}: create_all {create_all_queries} statements {create_all_ms:.2f} ms; "
+          f"version check {version_queries} statement(s) {version_ms:.2f} ms")
+
+    assert version_queries == 1
+    # create_all reflects every table before deciding there is nothing to do
+    assert create_all_queries >= len(db.metadata.tables)
+
+
+def test_version_is_one_upserted_row(app):
+    with app.app_context():
+        migrate()
+        migrations._record_version(db.engine, 1)
+        migrations._record_version(db.engine, LATEST_VERSION)
+        with db.engine.connect() as conn:
+            assert conn.execute(select(migrations.schema_version)).all() == [(1, LATEST_VERSION)]
+            with pytest.raises(IntegrityError):
+                conn.execute(migrations.schema_version.insert().values(id=2, version=1))
+
+
+def test_keyless_version_table_is_replaced(app):
+    with app.app_context():
+        migrations.schema_version.drop(bind=db.engine)
+        with db.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE schema_version (version INTEGER NOT NULL)'))
+            # Two cold starts racing the old select-then-insert
+            conn.execute(text('INSERT INTO schema_version VALUES (1), (1)'))
+        assert current_version() == 1
+
+        assert migrate() == [MIGRATIONS[1][:2]]
+        with db.engine.connect() as conn:
+            assert conn.execute(select(migrations.schema_version)).all() == [(1, LATEST_VERSION)]
+
+
+def test_migrate_rereads_the_version_once_it_holds_the_lock(app, monkeypatch):
+    @contextmanager
+    def lock_taken_by_another_process(engine):
+        # The other process migrated while this one waited for the lock
+        migrations._ensure_version_table(engine)
+        migrations._record_version(engine, LATEST_VERSION)
+        yield
+
+    monkeypatch.setattr(migrations, '_migration_lock', lock_taken_by_another_process)
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [
+        (version, description, lambda engine: pytest.fail('ran twice')) for version, description, _ in MIGRATIONS
+    ])
+    with app.app_context():
+        _drop_everything()
+        assert migrate() == []
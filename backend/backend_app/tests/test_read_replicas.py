@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import create_engine
+
+from src.models.user import db
+from src.services import database
+
+
+@pytest.fixture
+def lagging_replica(app, tmp_path, monkeypatch):
+    """A replica with the schema but none of the primary's rows."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(bind=engine)
+    with app.app_context():
+        engines = db.engines
+    monkeypatch.setitem(engines, 'replica_0', engine)
+    monkeypatch.setattr(database, '_replica_keys', ['replica_0'])
+    yield engine
+    engine.dispose()
+
+
+def test_replica_views_read_the_replica(client, seed, lagging_replica):
+    response = client.get('/api/user/users')
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_cached_salon_views_refill_from_the_primary(client, seed, lagging_replica):
+    salons = client.get('/api/booking/salons').get_json()['salons']
+    assert [s['id'] for s in salons] == [seed['salon']]
+
+    response = client.get(f"/api/booking/salon/{seed['salon']}")
+    assert response.status_code == 200
+    assert len(response.get_json()['salon']['barbers']) == 2
@@ -0,0 +1,115 @@
+import gzip
+import sys
+import types
+
+from flask import jsonify
+
+from src.models.user import db
+from src.models.booking import Salon, Barber
+from src.services import response_cache
+from src.services.response_cache import MemoryCache, cached_response
+
+
+def _view(calls, during=None):
+    @cached_response('things')
+    def view():
+        calls.append(1)
+        if during:
+            during()
+        return jsonify({'calls': len(calls)}), 200
+    return view
+
+
+def test_miss_overlapping_an_invalidation_is_not_stored(app, monkeypatch):
+    cache = MemoryCache()
+    monkeypatch.setattr(response_cache, '_cache', cache)
+    calls = []
+    # A commit lands while the miss is still reading the old rows
+    stale = _view(calls, during=lambda: cache.invalidate('things'))
+    fresh = _view(calls)
+
+    with app.test_request_context('/things'):
+        assert stale().get_json() == {'calls': 1}
+    with app.test_request_context('/things'):
+        assert fresh().get_json() == {'calls': 2}
+    with app.test_request_context('/things'):
+        assert fresh().get_json() == {'calls': 2}
+    assert len(calls) == 2
+
+
+class _FakeRedisModule(types.ModuleType):
+    """Just enough of redis-py for a server that refuses every connection."""
+
+    class RedisError(Exception):
+        pass
+
+    class Redis:
+        @classmethod
+        def from_url(cls, url):
+            return cls()
+
+        def __getattr__(self, name):
+            def refuse(*args, **kwargs):
+                raise _FakeRedisModule.RedisError('Connection refused')
+            return refuse
+
+
+def test_unreachable_redis_serves_responses_uncached(app, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'redis', _FakeRedisModule('redis'))
+    monkeypatch.setenv('STYLEME_CACHE_BACKEND', 'redis')
+    monkeypatch.setattr(response_cache, '_cache', None)
+    calls = []
+    view = _view(calls)
+
+    for _ in range(2):
+        with app.test_request_context('/things'):
+            response = view()
+            assert response.status_code == 200
+            assert response.get_json() == {'calls': len(calls)}
+    assert len(calls) == 2
+    # Invalidating after a commit does not fail it either
+    response_cache.get_cache().invalidate('things')
+
+
+def test_salon_listing_revalidates_and_is_invalidated_by_a_write(app, client, seed):
+    first = client.get('/api/booking/salons')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    cached = client.get('/api/booking/salons', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag and cached.get_data() == b''
+
+    with app.app_context():
+        db.session.get(Barber, seed['barbers'][0]).name = 'renamed'
+        db.session.commit()
+
+    changed = client.get('/api/booking/salons', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert 'renamed' in [b['name'] for b in changed.get_json()['salons'][0]['barbers']]
+
+
+def test_rolled_back_write_keeps_the_cache(app, client, seed):
+    etag = client.get(f"/api/booking/salon/{seed['salon']}").headers['ETag']
+    with app.app_context():
+        db.session.get(Salon, seed['salon']).name = 'never saved'
+        db.session.flush()
+        db.session.rollback()
+
+    assert client.get(f"/api/booking/salon/{seed['salon']}", headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_large_listing_is_served_precompressed(app, client, seed):
+    with app.app_context():
+        db.session.add_all([Barber(name=f'barber {i}', salon_id=seed['salon']) for i in range(20)])
+        db.session.commit()
+
+    plain = client.get('/api/booking/salons')
+    compressed = client.get('/api/booking/salons', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    # The gzip variant's validator revalidates too
+    assert client.get('/api/booking/salons', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']
+    }).status_code == 304
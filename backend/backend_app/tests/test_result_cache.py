@@ -0,0 +1,82 @@
+import base64
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from src.routes import ai_routes
+from src.services import result_cache
+from src.services.result_cache import ResultCache, content_key
+
+
+def _entry(tag, size=100):
+    return {'tag': tag, 'padding': 'x' * size}
+
+
+def test_hits_and_misses_are_counted():
+    cache = ResultCache(max_bytes=10_000)
+    key = content_key('generate_hairstyle', b'photo', 'short bob', 'png')
+
+    assert cache.get(key) is None
+    cache.set(key, _entry(1))
+    assert cache.get(key) == _entry(1)
+    # Another prompt for the same photo is another entry
+    assert cache.get(content_key('generate_hairstyle', b'photo', 'long', 'png')) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+
+
+def test_evicted_entries_spill_to_disk_and_come_back(tmp_path):
+    cache = ResultCache(max_bytes=300, spill_dir=str(tmp_path))
+    for tag in range(3):
+        cache.set(f'k{tag}', _entry(tag))
+
+    # The oldest entry no longer fits in memory and was written out
+    assert cache.stats()['entries'] == 2
+    assert os.listdir(tmp_path) == ['k0.json']
+
+    assert cache.get('k0') == _entry(0)
+    assert cache.stats()['disk_hits'] == 1
+    # Promoted back into memory, pushing out the next least recently used
+    assert cache.get('k0') == _entry(0) and cache.stats()['hits'] == 1
+    assert sorted(os.listdir(tmp_path)) == ['k0.json', 'k1.json']
+
+
+def test_without_a_spill_dir_evictions_are_dropped():
+    cache = ResultCache(max_bytes=300)
+    for tag in range(3):
+        cache.set(f'k{tag}', _entry(tag))
+    assert cache.get('k0') is None
+    assert cache.get('k2') == _entry(2)
+    # Entries larger than the whole cache are not stored at all
+    cache.set('big', _entry(9, size=1000))
+    assert cache.get('big') is None and cache.stats()['bytes'] <= 300
+
+
+def test_spill_directory_is_capped(tmp_path):
+    cache = ResultCache(max_bytes=150, spill_dir=str(tmp_path), disk_max_bytes=250)
+    for tag in range(6):
+        cache.set(f'k{tag}', _entry(tag))
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 250
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch):
+    cache = ResultCache()
+    monkeypatch.setattr(result_cache, '_result_cache', cache)
+    return cache
+
+
+def test_repeated_generation_is_served_from_the_cache(client, enabled_cache, monkeypatch):
+    ok, png = cv2.imencode('.png', np.full((40, 30, 3), 90, dtype=np.uint8))
+    body = {'image': 'data:image/png;base64,' + base64.b64encode(png.tobytes()).decode(), 'prompt': 'fade'}
+
+    first = client.post('/api/ai/generate_hairstyle', json=body)
+    assert first.status_code == 200
+    assert 'cache_lookup' in first.get_json()['timings_ms'] and 'generate' in first.get_json()['timings_ms']
+
+    monkeypatch.setattr(ai_routes, 'run_hairstyle_pipeline', lambda *args: pytest.fail('not served from cache'))
+    second = client.post('/api/ai/generate_hairstyle', json=body)
+    assert second.get_json()['generated_image'] == first.get_json()['generated_image']
+    assert 'generate' not in second.get_json()['timings_ms']
+    assert enabled_cache.stats()['hits'] == 1
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from src.models.user import db
+from src.models.booking import Barber, Booking, BarberSlot
+from src.services import migrations
+
+
+def test_barber_with_slots_can_be_deleted(client, seed, foreign_keys):
+    barber_id = seed['barbers'][0]
+    with client.application.app_context():
+        assert BarberSlot.query.filter_by(barber_id=barber_id).count() > 0
+
+    response = client.delete(f"/api/salon/salon/{seed['salon']}/barber/{barber_id}")
+
+    assert response.status_code == 200, response.get_json()
+    with client.application.app_context():
+        assert db.session.get(Barber, barber_id) is None
+        assert BarberSlot.query.filter_by(barber_id=barber_id).count() == 0
+
+
+def test_completed_bookings_release_their_slots(client, seed):
+    booking_id = seed['bookings'][0]
+
+    response = client.put(f'/api/booking/booking/{booking_id}/status', json={'status': 'completed'})
+
+    assert response.status_code == 200
+    with client.application.app_context():
+        assert BarberSlot.query.filter_by(booking_id=booking_id).count() == 0
+
+
+def test_past_bookings_hold_no_slots(client, seed):
+    response = client.post('/api/booking/book', json={
+        'user_id': seed['users'][0],
+        'salon_id': seed['salon'],
+        'barber_id': seed['barbers'][0],
+        'booking_time': (datetime.now() - timedelta(days=7)).isoformat(),
+    })
+
+    assert response.status_code == 201
+    with client.application.app_context():
+        booking = db.session.get(Booking, response.get_json()['booking_id'])
+        assert BarberSlot.query.filter_by(booking_id=booking.id).count() == 0
+
+
+def _as_upgraded_database(app, extra_bookings=()):
+    """Bookings written before slots existed: no barber_slot rows, schema at the baseline."""
+    with app.app_context():
+        db.session.add_all(list(extra_bookings))
+        db.session.commit()
+        BarberSlot.query.delete()
+        db.session.commit()
+        migrations._record_version(db.engine, 1)
+
+
+def test_migration_reserves_slots_of_existing_bookings(app, client, seed):
+    _as_upgraded_database(app)
+    with app.app_context():
+        migrations.migrate()
+        assert BarberSlot.query.count() > 0
+
+    response = client.post('/api/booking/book', json={
+        'user_id': seed['users'][1],
+        'salon_id': seed['salon'],
+        'barber_id': seed['barbers'][0],
+        'booking_time': seed['start'].isoformat(),
+    })
+    assert response.status_code == 409
+
+
+def test_migration_reports_overlapping_bookings(app, seed, caplog):
+    later = Booking(user_id=seed['users'][1], salon_id=seed['salon'], barber_id=seed['barbers'][0],
+                    booking_time=seed['start'], status='pending', created_at=datetime.utcnow() + timedelta(hours=1))
+    with app.app_context():
+        # Make room for the overlapping booking, as on a database that predates slots
+        BarberSlot.query.delete()
+        db.session.commit()
+    _as_upgraded_database(app, [later])
+
+    with app.app_context():
+        migrations.migrate()
+        later_id = Booking.query.order_by(Booking.id.desc()).first().id
+        assert BarberSlot.query.filter_by(booking_id=later_id).count() == 0
+    assert f'[{later_id}]' in caplog.text
+
+
+def test_booking_times_with_an_offset_are_stored_as_utc(client, seed):
+    payload = {
+        'user_id': seed['users'][0],
+        'salon_id': seed['salon'],
+        'barber_id': seed['barbers'][0],
+        'booking_time': '2030-01-01T10:00:00+03:00',
+    }
+    response = client.post('/api/booking/book', json=payload)
+    assert response.status_code == 201, response.get_json()
+    with client.application.app_context():
+        booking = db.session.get(Booking, response.get_json()['booking_id'])
+        assert booking.booking_time == datetime(2030, 1, 1, 7, 0)
+
+    # The same instant written in UTC is the same slot
+    response = client.post('/api/booking/book', json={**payload, 'booking_time': '2030-01-01T07:00:00Z'})
+    assert response.status_code == 409
+
+    response = client.post('/api/booking/bookings', json={'bookings': [{**payload, 'booking_time': '2030-01-02T10:00:00+03:00'}]})
+    assert response.status_code == 201
+
+    response = client.get(f"/api/booking/salon/{seed['salon']}/availability",
+                          query_string={'from': '2030-01-01T09:00:00+03:00', 'to': '2030-01-01T11:00:00+03:00'})
+    assert response.status_code == 200
+    slots = {b['barber_id']: b['slots'] for b in response.get_json()['barbers']}
+    assert '2030-01-01T07:00:00' not in slots[seed['barbers'][0]]
+    assert '2030-01-01T07:00:00' in slots[seed['barbers'][1]]